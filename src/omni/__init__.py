@@ -1,5 +1,6 @@
 from .client import OmniApiClient
 from .embed import OmniDashboardEmbedder, OmniFilterDefinition, OmniFilterSet
+from .verify import verify_url, verify_urls
 
 __version__ = "0.3.0-alpha"
 
@@ -8,4 +9,6 @@ __all__ = [
     "OmniDashboardEmbedder",
     "OmniFilterDefinition",
     "OmniFilterSet",
+    "verify_url",
+    "verify_urls",
 ]
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+from .utils import reset_after_fork
+
+
+class CacheBackend(ABC):
+    """Base class of caches where every entry expires after its own time to live. Used to keep metadata fetched from
+    the Omni API, such as dashboard filter definitions, and GET responses off the hot path of request handlers.
+
+    Subclasses store the entries by implementing `_get_entry`, `_set_entry`, `_delete_entry` and `_clear_entries`.
+    Expiry and background refreshes are handled here.
+
+    Args:
+        refresh_ahead: Fraction of an entry's time to live after which it is reloaded in the background when loaded
+            with `get_or_load(..., background_refresh=True)`.
+    """
+
+    def __init__(self, refresh_ahead: float = 0.8) -> None:
+        self.refresh_ahead = refresh_ahead
+        self._lock = threading.Lock()
+        # Keys with a scheduled background refresh, mapped to whether they have been read since the last refresh.
+        self._refreshing: dict[str, bool] = {}
+        reset_after_fork(self)
+
+    def get(self, key: str) -> Any | None:
+        """Returns the value for `key` or None if it is missing or expired."""
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            return None
+        if key in self._refreshing:
+            self._refreshing[key] = True
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Stores `value` for `ttl` seconds."""
+        self._set_entry(key, time.time() + ttl, value)
+
+    def delete(self, key: str) -> None:
+        """Removes `key` from the cache and stops refreshing it."""
+        with self._lock:
+            self._refreshing.pop(key, None)
+        self._delete_entry(key)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache and stops all background refreshes."""
+        with self._lock:
+            self._refreshing = {}
+        self._clear_entries()
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: float,
+        background_refresh: bool = False,
+    ) -> Any:
+        """Returns the cached value for `key`, calling `loader` to load and cache it if it is missing or expired.
+
+        Args:
+            key: Cache key.
+            loader: Function returning the value to cache.
+            ttl: Seconds the loaded value is cached for.
+            background_refresh: Reload the value in a background thread before it expires so that callers never wait
+                on `loader`. Refreshing stops once the value goes a full refresh interval without being read.
+
+        Returns:
+            : The cached or freshly loaded value.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        self.set(key, value, ttl)
+        if background_refresh:
+            with self._lock:
+                schedule = key not in self._refreshing
+                self._refreshing[key] = False
+            if schedule:
+                self._schedule_refresh(key, loader, ttl)
+        return value
+
+    @abstractmethod
+    def _get_entry(self, key: str) -> tuple[float, Any] | None:
+        """Returns the (expires_at, value) entry for `key`, expired or not, or None if there is none."""
+
+    @abstractmethod
+    def _set_entry(self, key: str, expires_at: float, value: Any) -> None:
+        """Stores `value` until the wall clock time `expires_at`."""
+
+    @abstractmethod
+    def _delete_entry(self, key: str) -> None: ...
+
+    @abstractmethod
+    def _clear_entries(self) -> None: ...
+
+    def _after_fork_in_child(self) -> None:
+        # The lock may have been held by another thread at the time of the fork, in which case it would never be
+        # released in the child. Refresh timers don't survive the fork either, so refreshes are scheduled afresh by
+        # the child's next loads.
+        self._lock = threading.Lock()
+        self._refreshing = {}
+
+    def _schedule_refresh(
+        self, key: str, loader: Callable[[], Any], ttl: float
+    ) -> None:
+        timer = threading.Timer(
+            ttl * self.refresh_ahead, self._refresh, (key, loader, ttl)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def _refresh(self, key: str, loader: Callable[[], Any], ttl: float) -> None:
+        with self._lock:
+            if not self._refreshing.get(key):
+                # Deleted, cleared or not read since the last refresh. Let the entry expire.
+                self._refreshing.pop(key, None)
+                return
+            self._refreshing[key] = False
+        # With a cache shared between processes, another process may have refreshed the entry already.
+        entry = self._get_entry(key)
+        if entry is None or entry[0] - time.time() <= ttl * (1 - self.refresh_ahead):
+            try:
+                self.set(key, loader(), ttl)
+            except Exception:
+                # Keep serving the current value, the next refresh or an expired read will try again.
+                with self._lock:
+                    self._refreshing[key] = True
+        self._schedule_refresh(key, loader, ttl)
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe in-memory cache, local to the process.
+
+    Args:
+        path: Optional path of a JSON file the cache is persisted to, so that entries survive process restarts.
+            Values must be JSON serializable when a path is given.
+        max_entries: Maximum number of entries. Expired entries are removed first, then the entries closest to
+            expiring. The cap is enforced every `prune_interval` writes, so it can be exceeded briefly.
+        prune_interval: Number of writes between checks of `max_entries`.
+        refresh_ahead: Fraction of an entry's time to live after which it is reloaded in the background when loaded
+            with `get_or_load(..., background_refresh=True)`.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str] | None = None,
+        max_entries: int = 10_000,
+        prune_interval: int = 100,
+        refresh_ahead: float = 0.8,
+    ) -> None:
+        super().__init__(refresh_ahead)
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        # Key -> (expires_at, value). Expiry uses wall clock time so persisted entries stay valid across restarts.
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._writes = 0
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_entry(self, key: str) -> tuple[float, Any] | None:
+        return self._entries.get(key)
+
+    def _set_entry(self, key: str, expires_at: float, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._writes += 1
+            if self._writes % self.prune_interval == 0:
+                self._prune()
+            self._persist()
+
+    def _delete_entry(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._persist()
+
+    def _clear_entries(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._persist()
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            # A missing or corrupt cache file just means a cold cache.
+            return
+        now = time.time()
+        self._entries = {
+            key: (expires_at, value)
+            for key, (expires_at, value) in entries.items()
+            if expires_at > now
+        }
+        self._prune()
+
+    def _prune(self) -> None:
+        """Removes expired entries, then the entries closest to expiring above `max_entries`. Must be called with the
+        lock held, except from `__init__`."""
+        now = time.time()
+        entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+        if (excess := len(entries) - self.max_entries) > 0:
+            for key in heapq.nsmallest(excess, entries, key=lambda k: entries[k][0]):
+                del entries[key]
+        self._entries = entries
+
+    def _persist(self) -> None:
+        """Atomically writes the cache to disk. Must be called with the lock held."""
+        if self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class SQLiteCache(CacheBackend):
+    """Cache stored in a SQLite database in WAL mode, shared by every process on the host that opens the same file.
+    With e.g. 32 gunicorn workers, a cached API response or dashboard configuration is loaded once per host instead
+    of once per worker, and background refreshes are skipped by workers when another one already refreshed the entry.
+
+    Values must be JSON serializable. Each process opens its own database connection on first use, so a cache created
+    before forking worker processes is safe to use in the workers.
+
+    Args:
+        path: Path of the database file.
+        max_entries: Maximum number of entries. Expired entries are removed first, then the entries closest to
+            expiring. The cap is enforced every `prune_interval` writes per process, so it can be exceeded briefly.
+        prune_interval: Number of writes by a process between checks of `max_entries`.
+        refresh_ahead: Fraction of an entry's time to live after which it is reloaded in the background when loaded
+            with `get_or_load(..., background_refresh=True)`.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        max_entries: int = 10_000,
+        prune_interval: int = 100,
+        refresh_ahead: float = 0.8,
+    ) -> None:
+        super().__init__(refresh_ahead)
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._db: sqlite3.Connection | None = None
+        self._db_pid: int | None = None
+        self._writes = 0
+        # Create the schema right away so configuration errors surface on creation.
+        self._get_db()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._get_db().execute("SELECT COUNT(*) FROM cache").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        """Closes this process's database connection. It is reopened on next use."""
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _get_db(self) -> sqlite3.Connection:
+        """Returns this process's connection. Must be called with the lock held, except from `__init__`."""
+        if self._db is None or self._db_pid != os.getpid():
+            # A connection inherited from a parent process must not be used or closed, SQLite connections can't be
+            # shared across a fork.
+            db = sqlite3.connect(
+                self.path, timeout=10, check_same_thread=False, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+            )
+            self._db = db
+            self._db_pid = os.getpid()
+            self._writes = 0
+        return self._db
+
+    def _get_entry(self, key: str) -> tuple[float, Any] | None:
+        with self._lock:
+            row = (
+                self._get_db()
+                .execute("SELECT expires_at, value FROM cache WHERE key = ?", (key,))
+                .fetchone()
+            )
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _set_entry(self, key: str, expires_at: float, value: Any) -> None:
+        serialized = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            db = self._get_db()
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, expires_at, serialized),
+            )
+            self._writes += 1
+            if self._writes % self.prune_interval == 0:
+                self._prune(db)
+
+    def _delete_entry(self, key: str) -> None:
+        with self._lock:
+            self._get_db().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _clear_entries(self) -> None:
+        with self._lock:
+            self._get_db().execute("DELETE FROM cache")
+
+    def _after_fork_in_child(self) -> None:
+        super()._after_fork_in_child()
+        self._db = None
+
+    def _prune(self, db: sqlite3.Connection) -> None:
+        db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM cache WHERE key IN "
+            "(SELECT key FROM cache ORDER BY expires_at LIMIT max((SELECT COUNT(*) FROM cache) - ?, 0))",
+            (self.max_entries,),
+        )
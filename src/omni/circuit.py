@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Callable
+
+import requests
+
+# Path segments that identify a single resource, e.g. UUIDs, numeric IDs and hex IDs. Replaced with a placeholder so
+# that all requests to the same endpoint share a circuit.
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F-]{8,})$")
+
+
+class CircuitState(Enum):
+    """Circuit states
+
+    Attributes:
+        closed: Requests are sent normally.
+        open: Requests fail immediately without being sent.
+        half_open: A limited number of probe requests are sent to check whether the endpoint has recovered.
+    """
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class OmniCircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while the circuit for its endpoint is open. Subclasses
+    `requests.ConnectionError` so existing handling of Omni being unreachable also covers failing fast.
+    """
+
+
+_Transition = tuple[CircuitState, CircuitState]
+
+
+class Circuit:
+    """State of a single circuit. Tracks the outcomes of the most recent calls and opens when too many of them failed
+    or were too slow.
+
+    Args:
+        key: Name of the circuit, e.g. `GET acme.omniapp.co/api/scim/v2/Users/{id}`.
+        breaker: Circuit breaker holding the thresholds and hooks for this circuit.
+    """
+
+    def __init__(self, key: str, breaker: CircuitBreaker) -> None:
+        self.key = key
+        self._breaker = breaker
+        self._lock = threading.Lock()
+        self._state = CircuitState.closed
+        self._outcomes: deque[bool] = deque(maxlen=breaker.window_size)
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            transition = self._update_state()
+            state = self._state
+        self._notify(transition)
+        return state
+
+    def allow_request(self) -> bool:
+        """Returns whether a request may be sent. In the half open state only `half_open_max_calls` probes are
+        allowed at a time."""
+        with self._lock:
+            transition = self._update_state()
+            allowed = self._state == CircuitState.closed or (
+                self._state == CircuitState.half_open
+                and self._probes < self._breaker.half_open_max_calls
+            )
+            if allowed and self._state == CircuitState.half_open:
+                self._probes += 1
+        self._notify(transition)
+        return allowed
+
+    def record(self, success: bool, duration: float) -> None:
+        """Records the outcome of a request. Requests slower than the breaker's `slow_call_duration` count as
+        failures."""
+        slow_call_duration = self._breaker.slow_call_duration
+        if slow_call_duration is not None and duration >= slow_call_duration:
+            success = False
+        transition = None
+        with self._lock:
+            if self._state == CircuitState.half_open:
+                self._probes = max(self._probes - 1, 0)
+                if success:
+                    self._outcomes.clear()
+                    transition = self._transition(CircuitState.closed)
+                else:
+                    transition = self._open()
+            elif self._state == CircuitState.closed:
+                # Outcomes of requests sent before the circuit opened are ignored.
+                self._outcomes.append(success)
+                if len(self._outcomes) >= self._breaker.minimum_calls:
+                    failure_rate = self._outcomes.count(False) / len(self._outcomes)
+                    if failure_rate >= self._breaker.failure_rate_threshold:
+                        transition = self._open()
+        self._notify(transition)
+
+    def _open(self) -> _Transition | None:
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        return self._transition(CircuitState.open)
+
+    def _update_state(self) -> _Transition | None:
+        if (
+            self._state == CircuitState.open
+            and time.monotonic() - self._opened_at >= self._breaker.open_duration
+        ):
+            return self._transition(CircuitState.half_open)
+        return None
+
+    def _transition(self, state: CircuitState) -> _Transition | None:
+        """Changes the state. Must be called with the lock held, the returned transition is passed to `_notify` once
+        the lock is released."""
+        previous, self._state = self._state, state
+        return (previous, state) if previous != state else None
+
+    def _notify(self, transition: _Transition | None) -> None:
+        # Called without the lock held, so the hook can read the state of this or any other circuit.
+        if transition is not None and self._breaker.on_state_change is not None:
+            self._breaker.on_state_change(self.key, *transition)
+
+
+class CircuitBreaker:
+    """Circuit breaker for `OmniApiClient`. Keeps a circuit per host, or per endpoint, that opens when the error rate
+    or latency of recent requests crosses a threshold. While a circuit is open requests fail immediately with
+    `OmniCircuitOpenError`, or are served the last successful response for GET requests when one is available, so
+    callers don't tie up workers waiting on Omni during an outage. After `open_duration` the circuit half opens and
+    lets probe requests through to check for recovery.
+
+    Connection errors, timeouts, 5xx responses and any other exception raised while sending a request count as
+    failures. Other 4xx responses are the caller's fault rather than Omni's and count as successes.
+
+    Args:
+        failure_rate_threshold: Fraction of failed calls in the window at which the circuit opens.
+        window_size: Number of most recent calls the failure rate is calculated over.
+        minimum_calls: Minimum number of calls in the window before the failure rate is evaluated.
+        slow_call_duration: Calls taking at least this many seconds count as failures. None to disable.
+        open_duration: Seconds a circuit stays open before half opening.
+        half_open_max_calls: Number of concurrent probe requests allowed while half open.
+        per_endpoint: Keep a circuit per method and endpoint rather than per host. IDs in paths are ignored, so
+            `/scim/v2/Users/1` and `/scim/v2/Users/2` share a circuit.
+        stale_responses: Maximum number of successful GET responses kept to serve while a circuit is open. 0 to
+            always fail fast.
+        on_state_change: Metrics hook called with the circuit key, the previous state and the new state whenever a
+            circuit changes state.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        minimum_calls: int = 10,
+        slow_call_duration: float | None = None,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+        per_endpoint: bool = True,
+        stale_responses: int = 256,
+        on_state_change: (
+            Callable[[str, CircuitState, CircuitState], None] | None
+        ) = None,
+    ) -> None:
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.slow_call_duration = slow_call_duration
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.per_endpoint = per_endpoint
+        self.stale_responses = stale_responses
+        self.on_state_change = on_state_change
+        self._lock = threading.Lock()
+        self._circuits: dict[str, Circuit] = {}
+        self._stale: OrderedDict[str, str] = OrderedDict()
+
+    @property
+    def circuits(self) -> dict[str, Circuit]:
+        """Circuits created so far, keyed by host or endpoint."""
+        return dict(self._circuits)
+
+    def get_circuit(self, method: str, url: str) -> Circuit:
+        """Returns the circuit for a request, creating it on first use."""
+        parsed = urllib.parse.urlsplit(url)
+        key = parsed.netloc
+        if self.per_endpoint:
+            path = "/".join(
+                "{id}" if _ID_SEGMENT.match(segment) else segment
+                for segment in parsed.path.split("/")
+            )
+            key = f"{method} {parsed.netloc}{path}"
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            with self._lock:
+                circuit = self._circuits.setdefault(key, Circuit(key, self))
+        return circuit
+
+    def get_stale(self, key: str) -> str | None:
+        """Returns the body of the last successful response stored for `key`, if any."""
+        with self._lock:
+            return self._stale.get(key)
+
+    def store_stale(self, key: str, response: str) -> None:
+        """Stores the body of a successful response to serve for `key` while its circuit is open. Bodies are stored as
+        text, so that each stale response served is decoded into a new object that callers may modify.
+        """
+        if not self.stale_responses:
+            return
+        with self._lock:
+            self._stale[key] = response
+            self._stale.move_to_end(key)
+            while len(self._stale) > self.stale_responses:
+                self._stale.popitem(last=False)
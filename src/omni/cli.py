@@ -0,0 +1,296 @@
+"""`omni` command line interface for bulk jobs.
+
+Examples:
+    Sign an embed URL for every record in a JSONL file of `OmniDashboardEmbedder.build_url` arguments:
+
+        omni embed sign --input users.jsonl --output urls.csv --format csv
+
+    Replay API operations, one JSON object per line with `method`, `path` and optional `params`/`json`:
+
+        omni api bulk --input ops.jsonl --output results.jsonl --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import functools
+import json
+import sys
+import time
+from enum import Enum
+from typing import IO, Any, ContextManager, Iterator, Sequence
+
+import requests
+
+from .client import OmniApiClient
+from .config import OmniConfigError, OmniConfigFile
+from .embed import OmniDashboardEmbedder
+from .utils import bounded_process_map, bounded_thread_map, chunked
+
+_ENUM_ARGS: dict[str, type[Enum]] = {
+    "entity_folder_content_role": OmniDashboardEmbedder.ContentRole,
+    "entity_folder_group_content_role": OmniDashboardEmbedder.ContentRole,
+    "mode": OmniDashboardEmbedder.AccessMode,
+    "prefers_dark": OmniDashboardEmbedder.PrefersDark,
+    "theme": OmniDashboardEmbedder.Theme,
+}
+
+# Embedder used by `omni embed sign` worker processes, created once per process by `_init_sign_worker`.
+_embedder: OmniDashboardEmbedder | None = None
+
+
+class _Progress:
+    """Reports progress and throughput to stderr at most once per `interval` seconds."""
+
+    def __init__(self, label: str, enabled: bool, interval: float = 1.0) -> None:
+        self.label = label
+        self.enabled = enabled
+        self.interval = interval
+        self.count = 0
+        self.errors = 0
+        self._start = self._last_report = time.monotonic()
+
+    def update(self, count: int, errors: int) -> None:
+        self.count += count
+        self.errors += errors
+        now = time.monotonic()
+        if self.enabled and now - self._last_report >= self.interval:
+            self._last_report = now
+            self._report(now)
+
+    def finish(self) -> None:
+        if self.enabled:
+            self._report(time.monotonic())
+
+    def _report(self, now: float) -> None:
+        elapsed = now - self._start
+        rate = self.count / elapsed if elapsed else 0.0
+        print(
+            f"{self.count} {self.label} ({rate:.0f}/s), {self.errors} errors, {elapsed:.1f}s elapsed",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def _open_input(path: str) -> ContextManager[IO[str]]:
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, encoding="utf-8")
+
+
+def _open_output(path: str) -> ContextManager[IO[str]]:
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _numbered_lines(f: IO[str]) -> Iterator[tuple[int, str]]:
+    for line_number, line in enumerate(f, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def _to_enum(enum_class: type[Enum], value: str) -> Enum:
+    """Accepts either the enum value (`APPLICATION`) or name (`application`)."""
+    try:
+        return enum_class(value)
+    except ValueError:
+        try:
+            return enum_class[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not a valid {enum_class.__name__}")
+
+
+def _init_sign_worker(config_path: str | None) -> None:
+    global _embedder
+    config = OmniConfigFile(config_path, poll_interval=0) if config_path else None
+    _embedder = OmniDashboardEmbedder(config=config)
+
+
+def _sign_chunk(
+    chunk: list[tuple[int, str]],
+) -> list[tuple[int, str | None, str | None, str | None]]:
+    """Signs a chunk of input lines in a worker process. Returns (line number, external ID, URL, error) per line."""
+    assert _embedder is not None
+    results: list[tuple[int, str | None, str | None, str | None]] = []
+    for line_number, line in chunk:
+        external_id = None
+        try:
+            kwargs = json.loads(line)
+            external_id = kwargs.get("external_id")
+            for arg, enum_class in _ENUM_ARGS.items():
+                if kwargs.get(arg) is not None:
+                    kwargs[arg] = _to_enum(enum_class, kwargs[arg])
+            url = _embedder.build_url(**kwargs)
+        except Exception as e:
+            results.append((line_number, external_id, None, f"{type(e).__name__}: {e}"))
+        else:
+            results.append((line_number, external_id, url, None))
+    return results
+
+
+def embed_sign(args: argparse.Namespace) -> int:
+    """Streams records through `OmniDashboardEmbedder.build_url` and writes the signed URLs."""
+    # Fail fast on missing configuration rather than in every worker process.
+    _init_sign_worker(args.config)
+    progress = _Progress("URLs signed", enabled=not args.quiet)
+    with _open_input(args.input) as input_file, _open_output(args.output) as output:
+        writer = csv.writer(output) if args.format == "csv" else None
+        if writer is not None:
+            writer.writerow(["line", "external_id", "url"])
+        results = bounded_process_map(
+            _sign_chunk,
+            chunked(_numbered_lines(input_file), args.chunk_size),
+            processes=args.processes,
+            initializer=_init_sign_worker,
+            initargs=(args.config,),
+        )
+        for chunk_results in results:
+            errors = 0
+            for line_number, external_id, url, error in chunk_results:
+                if error is not None:
+                    errors += 1
+                    print(f"line {line_number}: {error}", file=sys.stderr)
+                elif writer is not None:
+                    writer.writerow([line_number, external_id, url])
+                else:
+                    record = {
+                        "line": line_number,
+                        "external_id": external_id,
+                        "url": url,
+                    }
+                    output.write(json.dumps(record) + "\n")
+            progress.update(len(chunk_results), errors)
+    progress.finish()
+    return 1 if progress.errors else 0
+
+
+def _run_operation(client: OmniApiClient, item: tuple[int, str]) -> dict[str, Any]:
+    """Sends a single API operation. Returns the JSONL result record for the operation."""
+    line_number, line = item
+    try:
+        operation = json.loads(line)
+        method = operation.get("method", "GET").upper()
+        path = operation["path"]
+        if method == "GET":
+            response = client.get(path, params=operation.get("params"))
+        elif method == "POST":
+            response = client.post(path, json_data=operation.get("json"))
+        elif method == "PUT":
+            response = client.put(path, json_data=operation.get("json"))
+        elif method == "DELETE":
+            response = client.delete(path)
+        else:
+            raise ValueError(f"Unsupported method {method!r}")
+    except requests.HTTPError as e:
+        status_code = e.response.status_code if e.response is not None else None
+        return {
+            "line": line_number,
+            "status": "error",
+            "status_code": status_code,
+            "error": str(e),
+        }
+    except Exception as e:
+        return {
+            "line": line_number,
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+        }
+    return {"line": line_number, "status": "ok", "response": response}
+
+
+def api_bulk(args: argparse.Namespace) -> int:
+    """Replays API operations against `OmniApiClient` with bounded concurrency."""
+    config = OmniConfigFile(args.config, poll_interval=0) if args.config else None
+    client = OmniApiClient(config=config, max_connections=args.concurrency)
+    progress = _Progress("operations", enabled=not args.quiet)
+    with _open_input(args.input) as input_file, _open_output(args.output) as output:
+        results = bounded_thread_map(
+            functools.partial(_run_operation, client),
+            _numbered_lines(input_file),
+            threads=args.concurrency,
+        )
+        for result in results:
+            is_error = result["status"] == "error"
+            if is_error:
+                print(f"line {result['line']}: {result['error']}", file=sys.stderr)
+            output.write(json.dumps(result) + "\n")
+            progress.update(1, int(is_error))
+    client.close()
+    progress.finish()
+    return 1 if progress.errors else 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="omni", description="Omni SDK command line tools."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--input", default="-", help="Input JSONL file. Defaults to stdin."
+    )
+    common.add_argument(
+        "--output", default="-", help="Output file. Defaults to stdout."
+    )
+    common.add_argument(
+        "--config",
+        help="TOML or JSON config file. Defaults to OMNI_* environment variables.",
+    )
+    common.add_argument(
+        "--quiet", action="store_true", help="Don't report progress on stderr."
+    )
+
+    embed = commands.add_parser("embed", help="Dashboard embedding.")
+    embed_commands = embed.add_subparsers(dest="embed_command", required=True)
+    sign = embed_commands.add_parser(
+        "sign",
+        parents=[common],
+        help="Sign embed URLs for a JSONL file of build_url arguments.",
+    )
+    sign.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    sign.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Number of worker processes. Defaults to the number of CPUs.",
+    )
+    sign.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Number of records sent to a worker process at a time.",
+    )
+    sign.set_defaults(func=embed_sign)
+
+    api = commands.add_parser("api", help="REST API.")
+    api_commands = api.add_subparsers(dest="api_command", required=True)
+    bulk = api_commands.add_parser(
+        "bulk",
+        parents=[common],
+        help="Replay a JSONL file of GET/POST/PUT/DELETE operations.",
+    )
+    bulk.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent requests.",
+    )
+    bulk.set_defaults(func=api_bulk)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    try:
+        return int(args.func(args))
+    except OmniConfigError as e:
+        print(f"omni: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,33 @@
 from __future__ import annotations
 
-from typing import Literal
+import asyncio
+import dataclasses
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import IO, Any, Iterable, Iterator, Literal
 
 import requests
 
-from .config import OmniConfig
+from .cache import CacheBackend
+from .circuit import CircuitBreaker, OmniCircuitOpenError
+from .config import OmniConfig, OmniConfigSource
+from .models import Document, ScimGroup, ScimUser, split_page
+from .transport import (
+    STREAM_CHUNK_SIZE,
+    RequestBody,
+    RequestsTransport,
+    Transport,
+    TransportResponse,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class OmniApiClient:
@@ -12,25 +35,81 @@ class OmniApiClient:
     API (get, post, put, delete). These methods take a "path" arg that is equivalent to the path given in the Omni
     API docs. The client also includes convenience methods for common tasks.
 
+    Requests are sent over a pool of keep-alive connections. A single client can be shared by all threads of a process
+    and safely used concurrently. It is also safe to create a client before forking worker processes, e.g. at module
+    level with gunicorn or celery: each process lazily opens its own connection pool on first use rather than sharing
+    sockets inherited from its parent.
+
     Args:
         organization_name: Omni organization name. OMNI_ORGANIZATION_NAME environment variable will be used as a fallback.
         api_key: Omni API key. OMNI_API_KEY environment variable will be used as a fallback.
+        config: Shared configuration to use instead of the other arguments. Either an `OmniConfig` snapshot or an
+            `OmniConfigFile`, in which case a rotated API key is picked up without recreating the client.
+        max_connections: Maximum number of keep-alive connections kept open per process. Should be at least the number
+            of threads making concurrent requests. Only used by the default transport.
+        circuit_breaker: Circuit breaker that fails requests fast while Omni, or one of its endpoints, is failing or
+            slow. Requests are always sent when None.
+        transport: Transport that sends the requests, e.g. `Urllib3Transport` or `InMemoryTransport` for tests.
+            Defaults to a `RequestsTransport` with `max_connections` connections.
+        cache: Cache for GET responses. Pass a `SQLiteCache` to share cached responses between the processes on a
+            host. Responses are cached per API key, as JSON text, so every hit returns a new object that callers may
+            modify. A POST, PUT or DELETE by this client evicts the cached response of the same path without a query
+            string. Other cached responses, e.g. listings with query parameters or those of other API keys, are
+            served until they expire. GET requests are never cached when None.
+        cache_ttl: Seconds GET responses are cached for.
 
     Attributes:
         base_url: Omni REST API base URL that paths will be appended to.
-        api_key: Omni API key.
+        api_key: Omni API key, read from `config` on every request. Assigning a new key stops changes to the config
+            source from being picked up.
     """
 
+    _REQUIRED_CONFIG = ("organization_name", "api_key")
+
     def __init__(
-        self, organization_name: str | None = None, api_key: str | None = None
+        self,
+        organization_name: str | None = None,
+        api_key: str | None = None,
+        config: OmniConfigSource | None = None,
+        max_connections: int = 10,
+        circuit_breaker: CircuitBreaker | None = None,
+        transport: Transport | None = None,
+        cache: CacheBackend | None = None,
+        cache_ttl: float = 60.0,
     ) -> None:
-        omni_config = OmniConfig(
-            required_attrs=["organization_name", "api_key"],
-            organization_name=organization_name,
-            api_key=api_key,
+        if config is None:
+            config = OmniConfig(
+                required_attrs=self._REQUIRED_CONFIG,
+                organization_name=organization_name,
+                api_key=api_key,
+            )
+        else:
+            config.require(self._REQUIRED_CONFIG)
+        self._config = config
+        self.base_url = f"https://{config.current.organization_name}.omniapp.co/api"
+        self.max_connections = max_connections
+        self.circuit_breaker = circuit_breaker
+        self.transport = (
+            transport
+            if transport is not None
+            else RequestsTransport(max_connections=max_connections)
         )
-        self.base_url = f"https://{omni_config.organization_name}.omniapp.co/api"
-        self.api_key = omni_config.api_key
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self._keepalive_stop: threading.Event | None = None
+
+    @property
+    def api_key(self) -> str:
+        # Read from the config source on every access so a hot-reloaded API key takes effect immediately.
+        api_key = self._config.current.api_key
+        # Required to appease mypy. A missing API key is rejected by OmniConfig.require.
+        assert api_key
+        return api_key
+
+    @api_key.setter
+    def api_key(self, api_key: str) -> None:
+        # Pins the client to a snapshot with the new key, changes to a config file are no longer picked up.
+        self._config = dataclasses.replace(self._config.current, api_key=api_key)
 
     def refresh_model(self, model_id: str) -> bool:
         """Refreshes this model to reflect the latest structures (schemas, views, fields) from the data source.
@@ -46,6 +125,64 @@ class OmniApiClient:
         self.post(f"/v0/model/{model_id}/refresh")
         return True
 
+    def list_users(
+        self, filter: str | None = None, page_size: int = 100
+    ) -> Iterator[ScimUser]:
+        """Lists users through the SCIM API, fetching further pages as the iterator is consumed. Each user is kept as the
+        raw JSON of the response and decoded on first access to a field, which keeps large user lists small in memory.
+
+        Args:
+            filter: SCIM filter expression, e.g. `userName eq "somebody@example.com"`.
+            page_size: Number of users requested per page.
+
+        Returns:
+            : Iterator of users.
+        """
+        for resource in self._iter_scim_resources("/scim/v2/Users", filter, page_size):
+            yield ScimUser(resource)
+
+    def list_groups(
+        self, filter: str | None = None, page_size: int = 100
+    ) -> Iterator[ScimGroup]:
+        """Lists groups through the SCIM API, fetching further pages as the iterator is consumed. Each group is kept as
+        the raw JSON of the response and decoded on first access to a field.
+
+        Args:
+            filter: SCIM filter expression, e.g. `displayName eq "Sales"`.
+            page_size: Number of groups requested per page.
+
+        Returns:
+            : Iterator of groups.
+        """
+        for resource in self._iter_scim_resources("/scim/v2/Groups", filter, page_size):
+            yield ScimGroup(resource)
+
+    def list_documents(
+        self, params: dict | None = None, page_size: int = 100
+    ) -> Iterator[Document]:
+        """Lists documents, fetching further pages as the iterator is consumed. Each document is kept as the raw JSON
+        of the response and decoded on first access to a field.
+
+        Args:
+            params: Additional query string parameters, e.g. `{"folderId": ...}`.
+            page_size: Number of documents requested per page.
+
+        Returns:
+            : Iterator of documents.
+        """
+        params = {**(params or {}), "pageSize": page_size}
+        while True:
+            page, records = split_page(
+                self._request_raw("GET", "/v1/documents", params=params).content,
+                "records",
+            )
+            for record in records:
+                yield Document(record)
+            page_info = page.get("pageInfo") or {}
+            if not page_info.get("hasNextPage") or not page_info.get("nextCursor"):
+                return
+            params["cursor"] = page_info["nextCursor"]
+
     def get(self, path: str, params: dict | None = None) -> dict:
         """Makes a GET request to the Omni REST API.
 
@@ -58,29 +195,69 @@ class OmniApiClient:
         """
         return self._request("GET", path, params=params)
 
-    def post(self, path: str, json_data: dict | None = None) -> dict:
+    def post(
+        self,
+        path: str,
+        json_data: dict | None = None,
+        data: RequestBody | None = None,
+        compress: bool = False,
+        content_type: str = "application/json",
+    ) -> dict:
         """Makes a POST request to the Omni REST API.
 
         Args:
             path: The path in the Omni REST API to make a POST request.
             json_data: Query string parameters to use in the POST request.
+            data: Pre-serialized request body to send instead of `json_data`. Either bytes, a binary file-like object
+                or an iterable of byte chunks. File-like objects and iterables are streamed rather than loaded into
+                memory, with chunked transfer encoding when their size isn't known up front.
+            compress: Gzip the request body and send it with `Content-Encoding: gzip`. Streamed bodies are compressed
+                chunk by chunk.
+            content_type: Content type of `data`.
 
         Returns:
             JSON response from the Omni REST API.
         """
-        return self._request("POST", path, json_data=json_data)
+        return self._request(
+            "POST",
+            path,
+            json_data=json_data,
+            data=data,
+            compress=compress,
+            content_type=content_type,
+        )
 
-    def put(self, path: str, json_data: dict | None = None) -> dict:
+    def put(
+        self,
+        path: str,
+        json_data: dict | None = None,
+        data: RequestBody | None = None,
+        compress: bool = False,
+        content_type: str = "application/json",
+    ) -> dict:
         """Makes a PUT request to the Omni REST API.
 
         Args:
             path: The path in the Omni REST API to make a PUT request.
             json_data: Query string parameters to use in the PUT request.
+            data: Pre-serialized request body to send instead of `json_data`. Either bytes, a binary file-like object
+                or an iterable of byte chunks. File-like objects and iterables are streamed rather than loaded into
+                memory, with chunked transfer encoding when their size isn't known up front.
+            compress: Gzip the request body and send it with `Content-Encoding: gzip`. Streamed bodies are compressed
+                chunk by chunk.
+            content_type: Content type of `data`.
 
         Returns:
             JSON response from the Omni REST API.
         """
-        return self._request("PUT", path, json_data=json_data)
+        return self._request(
+            "PUT",
+            path,
+            json_data=json_data,
+            data=data,
+            compress=compress,
+            content_type=content_type,
+        )
 
     def delete(self, path: str) -> dict:
         """Makes a DELETE request to the Omni REST API.
@@ -90,6 +267,186 @@ class OmniApiClient:
         """
         return self._request("DELETE", path)
 
+    def get_raw(
+        self,
+        path: str,
+        params: dict | None = None,
+        stream: bool = False,
+        raise_for_status: bool = True,
+        decode_content: bool = False,
+    ) -> TransportResponse:
+        """Makes a GET request to the Omni REST API and returns the response without decoding the body as JSON, e.g.
+        to proxy it to a browser as is. Responses are not cached and aren't served stale when the circuit is open.
+
+        Args:
+            path: The path in the Omni REST API to make a GET request.
+            params: Query string parameters to use in the GET request.
+            stream: Return as soon as the response headers are received and read the body with
+                `TransportResponse.iter_content`. The connection is held until the body has been read or the response
+                is closed.
+            raise_for_status: Raise `OmniHTTPError` for 4xx and 5xx responses. When False, error responses are
+                returned like any other, e.g. to pass them on to the proxy's client.
+            decode_content: Decompress the body if Omni sent it compressed. By default the body is returned as
+                received, so that it matches the `Content-Encoding` and `Content-Length` headers and can be forwarded
+                together with them without paying for decompression.
+
+        Returns:
+            : Response with the status code, headers and body bytes.
+        """
+        return self._request_raw(
+            "GET",
+            path,
+            params=params,
+            stream=stream,
+            raise_for_status=raise_for_status,
+            decode_content=decode_content,
+        )
+
+    def post_raw(
+        self,
+        path: str,
+        json_data: dict | None = None,
+        data: RequestBody | None = None,
+        compress: bool = False,
+        content_type: str = "application/json",
+        stream: bool = False,
+        raise_for_status: bool = True,
+        decode_content: bool = False,
+    ) -> TransportResponse:
+        """Makes a POST request to the Omni REST API and returns the response without decoding the body as JSON. Takes
+        the same arguments as `post`, and `stream`, `raise_for_status` and `decode_content` as described in `get_raw`.
+
+        Returns:
+            : Response with the status code, headers and body bytes.
+        """
+        return self._request_raw(
+            "POST",
+            path,
+            json_data=json_data,
+            data=data,
+            compress=compress,
+            content_type=content_type,
+            stream=stream,
+            raise_for_status=raise_for_status,
+            decode_content=decode_content,
+        )
+
+    def put_raw(
+        self,
+        path: str,
+        json_data: dict | None = None,
+        data: RequestBody | None = None,
+        compress: bool = False,
+        content_type: str = "application/json",
+        stream: bool = False,
+        raise_for_status: bool = True,
+        decode_content: bool = False,
+    ) -> TransportResponse:
+        """Makes a PUT request to the Omni REST API and returns the response without decoding the body as JSON. Takes
+        the same arguments as `put`, and `stream`, `raise_for_status` and `decode_content` as described in `get_raw`.
+
+        Returns:
+            : Response with the status code, headers and body bytes.
+        """
+        return self._request_raw(
+            "PUT",
+            path,
+            json_data=json_data,
+            data=data,
+            compress=compress,
+            content_type=content_type,
+            stream=stream,
+            raise_for_status=raise_for_status,
+            decode_content=decode_content,
+        )
+
+    def delete_raw(self, path: str, raise_for_status: bool = True) -> TransportResponse:
+        """Makes a DELETE request to the Omni REST API and returns the response without decoding the body as JSON,
+        e.g. for endpoints that respond with `204 No Content`. `raise_for_status` is described in `get_raw`.
+
+        Returns:
+            : Response with the status code, headers and body bytes.
+        """
+        return self._request_raw(
+            "DELETE", path, raise_for_status=raise_for_status, decode_content=False
+        )
+
+    def warmup(
+        self, connections: int | None = None, keepalive: float | None = None
+    ) -> int:
+        """Resolves the Omni API host and opens pooled keep-alive connections to it, so that the first requests don't
+        pay for DNS resolution, the TCP connect and the TLS handshake. Call it at process start, e.g. in a gunicorn
+        `post_fork` hook, as connections are pooled per process.
+
+        Args:
+            connections: Number of connections to open. Defaults to the transport's `max_connections`, or the
+                client's for transports without one.
+            keepalive: Seconds between re-warming the pool in a background thread, replacing connections that the
+                server closed while idle. Disabled when None. The thread stops on `close`.
+
+        Returns:
+            : Number of connections that were opened.
+        """
+        if connections is None:
+            connections = getattr(
+                self.transport, "max_connections", self.max_connections
+            )
+        opened = self.transport.warmup(self.base_url, connections)
+        if keepalive is not None:
+            self._stop_keepalive()
+            stop = self._keepalive_stop = threading.Event()
+            thread = threading.Thread(
+                target=self._keepalive,
+                args=(stop, connections, keepalive),
+                daemon=True,
+            )
+            thread.start()
+        return opened
+
+    async def awarmup(
+        self, connections: int | None = None, keepalive: float | None = None
+    ) -> int:
+        """Async version of `warmup`. Connections are opened in a worker thread without blocking the event loop."""
+        return await asyncio.to_thread(self.warmup, connections, keepalive)
+
+    def close(self) -> None:
+        """Closes the connections pooled by this process. The client can still be used afterwards, a new pool will be
+        opened on the next request."""
+        self._stop_keepalive()
+        self.transport.close()
+
+    def _keepalive(
+        self, stop: threading.Event, connections: int, interval: float
+    ) -> None:
+        while not stop.wait(interval):
+            try:
+                self.transport.warmup(self.base_url, connections)
+            except requests.RequestException:
+                logger.warning("Failed to re-warm Omni API connections.", exc_info=True)
+
+    def _stop_keepalive(self) -> None:
+        if self._keepalive_stop is not None:
+            self._keepalive_stop.set()
+            self._keepalive_stop = None
+
+    def _iter_scim_resources(
+        self, path: str, filter: str | None, page_size: int
+    ) -> Iterator[bytes]:
+        params: dict = {"count": page_size}
+        if filter is not None:
+            params["filter"] = filter
+        # SCIM start indexes are 1-based.
+        start_index = 1
+        while True:
+            params["startIndex"] = start_index
+            page, resources = split_page(
+                self._request_raw("GET", path, params=params).content, "Resources"
+            )
+            yield from resources
+            start_index += len(resources)
+            if not resources or start_index > page.get("totalResults", 0):
+                return
+
     def _get_url(self, path: str) -> str:
         return f"{self.base_url.strip('/')}/{path.strip('/')}"
 
@@ -99,13 +456,171 @@ class OmniApiClient:
         path: str,
         json_data: dict | None = None,
         params: dict | None = None,
+        data: RequestBody | None = None,
+        compress: bool = False,
+        content_type: str = "application/json",
     ) -> dict:
-        response = requests.request(
-            method=method,
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            url=self._get_url(path),
-            json=json_data,
-            params=params,
-        )
+        url = self._get_url(path)
+        if params:
+            url = f"{url}?{_encode_params(params)}"
+        cache_key = self._get_cache_key(url) if method == "GET" else None
+        if cache_key is not None and self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+
+        try:
+            response = self._send(
+                method, url, json_data, data, compress, content_type, stream=False
+            )
+        except OmniCircuitOpenError:
+            if cache_key is not None and self.circuit_breaker is not None:
+                stale = self.circuit_breaker.get_stale(cache_key)
+                if stale is not None:
+                    return json.loads(stale)
+            raise
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        if cache_key is not None:
+            # Stored as text rather than the decoded object, which in-process caches would hand out to every caller.
+            # Keyed like cached responses, so a breaker shared by clients with different API keys keeps them apart.
+            text = response.content.decode("utf-8")
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.store_stale(cache_key, text)
+            if self.cache is not None:
+                self.cache.set(cache_key, text, self.cache_ttl)
+        return result
+
+    def _get_cache_key(self, url: str) -> str:
+        # Keyed by API key as responses depend on the key's permissions. Hashed to keep the key out of the cache.
+        api_key_hash = hashlib.sha256(self.api_key.encode("utf-8")).hexdigest()
+        return f"response:{api_key_hash[:16]}:{url}"
+
+    def _request_raw(
+        self,
+        method: Literal["GET", "POST", "PUT", "DELETE"],
+        path: str,
+        json_data: dict | None = None,
+        params: dict | None = None,
+        data: RequestBody | None = None,
+        compress: bool = False,
+        content_type: str = "application/json",
+        stream: bool = False,
+        raise_for_status: bool = True,
+        decode_content: bool = True,
+    ) -> TransportResponse:
+        url = self._get_url(path)
+        if params:
+            url = f"{url}?{_encode_params(params)}"
+        response = self._send(
+            method,
+            url,
+            json_data,
+            data,
+            compress,
+            content_type,
+            stream=stream,
+            decode_content=decode_content,
+        )
+        if raise_for_status and not response.ok:
+            if response.headers.get("Content-Encoding") in ("gzip", "deflate") and (
+                not decode_content
+            ):
+                # The body of OmniHTTPError.response is decompressed, as for errors raised by requests.
+                response.content = zlib.decompress(
+                    response.read(), wbits=zlib.MAX_WBITS | 32
+                )
+            response.raise_for_status()
+        return response
+
+    def _send(
+        self,
+        method: Literal["GET", "POST", "PUT", "DELETE"],
+        url: str,
+        json_data: dict | None,
+        data: RequestBody | None,
+        compress: bool,
+        content_type: str,
+        stream: bool,
+        decode_content: bool = True,
+    ) -> TransportResponse:
+        """Sends a request through the circuit breaker and returns the response without checking its status."""
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        if data is not None:
+            if json_data is not None:
+                raise ValueError("Pass either json_data or data, not both.")
+            headers["Content-Type"] = content_type
+        elif json_data is not None:
+            data = json.dumps(json_data, allow_nan=False).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if compress and data is not None:
+            data = _gzip_body(data)
+            headers["Content-Encoding"] = "gzip"
+
+        circuit = None
+        if self.circuit_breaker is not None:
+            circuit = self.circuit_breaker.get_circuit(method, url)
+            if not circuit.allow_request():
+                raise OmniCircuitOpenError(
+                    f"Circuit {circuit.key!r} is open, not sending the request."
+                )
+
+        started = time.monotonic()
+        try:
+            response = self.transport.request(
+                method,
+                url,
+                headers,
+                data,
+                stream=stream,
+                decode_content=decode_content,
+            )
+        except BaseException:
+            # Any exception counts as a failure, not only requests' ones, so that a half open probe slot is always
+            # released. Otherwise the circuit would never let another probe through.
+            if circuit is not None:
+                circuit.record(False, time.monotonic() - started)
+            raise
+        finally:
+            if method != "GET" and self.cache is not None:
+                # Evicted even if the write failed, it may have been applied before the connection dropped.
+                self.cache.delete(self._get_cache_key(url.partition("?")[0]))
+        if circuit is not None:
+            # 4xx responses are caused by the request rather than by Omni being unhealthy. Streamed responses are
+            # timed up to the headers.
+            circuit.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+
+def _encode_params(params: dict) -> str:
+    """Encodes query string parameters the way `requests` does: sequences become repeated parameters and None values
+    are left out."""
+    pairs: list[tuple[str, Any]] = []
+    for key, values in params.items():
+        if isinstance(values, (str, bytes)) or not isinstance(values, Iterable):
+            values = [values]
+        pairs.extend((key, value) for value in values if value is not None)
+    return urllib.parse.urlencode(pairs)
+
+
+def _gzip_body(data: RequestBody | None) -> bytes | Iterator[bytes]:
+    """Gzips a request body. Bytes are compressed in one go, streamed bodies are compressed lazily chunk by chunk."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return gzip.compress(data)
+    return _gzip_chunks(data)
+
+
+def _gzip_chunks(data: IO[bytes] | Iterable[bytes] | None) -> Iterator[bytes]:
+    if data is None:
+        return
+    if hasattr(data, "read"):
+        chunks: Iterable[bytes] = iter(
+            functools.partial(data.read, STREAM_CHUNK_SIZE), b""
+        )
+    else:
+        chunks = data
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
@@ -1,15 +1,36 @@
 from __future__ import annotations
 
+import json
+import logging
 import os
+import sys
+import threading
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Protocol, Sequence
 
+from .utils import reset_after_fork
 
-@dataclass
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+CONFIG_ATTRS = ("organization_name", "vanity_domain", "embed_secret", "api_key")
+
+
+@dataclass(frozen=True, slots=True)
 class OmniConfig:
-    """Fetches configuration options from arguments or environment variables."""
+    """Immutable snapshot of configuration options. Options that are not passed as arguments fall back to environment
+    variables with the OMNI_ prefix. Options are resolved once on creation, so a single snapshot can be shared by
+    any number of `OmniApiClient` and `OmniDashboardEmbedder` instances.
+    """
 
-    required_attrs: list[str]
+    required_attrs: Sequence[str] = ()
     organization_name: str | None = None
     vanity_domain: str | None = None
     embed_secret: str | None = None
@@ -19,18 +40,26 @@ class OmniConfig:
     def _get_env_var(attr_name: str) -> str:
         return f"OMNI_{attr_name.upper()}"
 
-    def __getattribute__(self, name: str) -> Any:
-        """Overrides built-in `__getattribute__` to fall back to environment variables with the OMNI_ prefix."""
-        value = super().__getattribute__(name)
-        if value is None:
-            value = os.environ.get(self._get_env_var(name))
-        return value
-
     def __post_init__(self) -> None:
-        """Raises an error if a required config setting is missing."""
-        if missing_required_attrs := [
-            a for a in self.required_attrs if not getattr(self, a)
-        ]:
+        """Falls back to environment variables for missing settings and raises an error if a required setting is
+        missing."""
+        for attr in CONFIG_ATTRS:
+            if getattr(self, attr) is None:
+                object.__setattr__(self, attr, os.environ.get(self._get_env_var(attr)))
+        self.require(self.required_attrs)
+
+    @property
+    def current(self) -> OmniConfig:
+        """The snapshot itself. Allows a snapshot to be used anywhere an `OmniConfigSource` is expected."""
+        return self
+
+    def require(self, attrs: Sequence[str]) -> None:
+        """Raises an error if any of the given settings are missing.
+
+        Args:
+            attrs: Names of the required settings.
+        """
+        if missing_required_attrs := [a for a in attrs if not getattr(self, a)]:
             message = (
                 f"Omni SDK has not been configured correctly. You must pass the arguments {missing_required_attrs} and/or set "
                 f"the environment variables {[self._get_env_var(a) for a in missing_required_attrs]}. Please see the documentation "
@@ -39,5 +68,144 @@ class OmniConfig:
             raise OmniConfigError(message)
 
 
+class OmniConfigSource(Protocol):
+    """Anything that provides the current configuration snapshot, i.e. `OmniConfig` or `OmniConfigFile`."""
+
+    @property
+    def current(self) -> OmniConfig: ...
+
+    def require(self, attrs: Sequence[str]) -> None: ...
+
+
+class OmniConfigFile:
+    """Configuration source backed by a TOML or JSON file that is watched for changes. When the file changes a new
+    `OmniConfig` snapshot is swapped in atomically, so rotated API keys and embed secrets are picked up by
+    long-running processes without a restart. The file is watched by a background thread, which is restarted in
+    forked child processes, so a source created before forking worker processes keeps watching in every worker.
+
+    The file contains any of the keys `organization_name`, `vanity_domain`, `embed_secret` and `api_key`, either at
+    the top level or in an `omni` table/object. Missing keys fall back to environment variables. If the file can't be
+    read or is missing a setting that is required by this source or by any client or embedder using it on reload, the
+    previous snapshot is kept.
+
+    Reading TOML files requires Python 3.11+ or the `tomli` package.
+
+    Args:
+        path: Path of the config file. Files ending in `.toml` are parsed as TOML, anything else as JSON.
+        required_attrs: Settings that must be present in every snapshot.
+        poll_interval: Seconds between checks of the file for changes. Pass 0 to disable watching, `reload` can still
+            be called manually.
+
+    Attributes:
+        path: Path of the config file.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        required_attrs: Sequence[str] = (),
+        poll_interval: float = 5.0,
+    ) -> None:
+        self.path = path
+        self._required_attrs = tuple(required_attrs)
+        self._file_version = self._get_file_version()
+        self._current = self._read()
+        self._poll_interval = poll_interval
+        self._stop = threading.Event()
+        if poll_interval > 0:
+            self._start_watcher()
+            reset_after_fork(self)
+
+    @property
+    def current(self) -> OmniConfig:
+        """The most recently loaded configuration snapshot."""
+        return self._current
+
+    def require(self, attrs: Sequence[str]) -> None:
+        """Raises an error if any of the given settings are missing from the current snapshot, and rejects reloads of
+        files that are missing them from then on. Called by every client and embedder using this source.
+
+        Args:
+            attrs: Names of the required settings.
+        """
+        self._current.require(attrs)
+        # A single reference assignment, so a concurrent reload sees either the old or the new requirements.
+        self._required_attrs = tuple(dict.fromkeys((*self._required_attrs, *attrs)))
+
+    def reload(self) -> bool:
+        """Reloads the file if it has changed since it was last loaded.
+
+        Returns:
+            : True if a new snapshot was loaded.
+        """
+        file_version = self._get_file_version()
+        if file_version == self._file_version:
+            return False
+        # Recorded before reading so a broken file is only reported once per change.
+        self._file_version = file_version
+        try:
+            config = self._read()
+        except (OSError, ValueError, OmniConfigError):
+            logger.exception(
+                "Failed to reload Omni config from %s, keeping the previous config.",
+                self.path,
+            )
+            return False
+        # A single reference assignment, so readers always see either the old or the new snapshot.
+        self._current = config
+        return True
+
+    def close(self) -> None:
+        """Stops watching the file for changes."""
+        self._stop.set()
+
+    def _start_watcher(self) -> None:
+        watcher = threading.Thread(
+            target=self._watch, args=(self._stop, self._poll_interval), daemon=True
+        )
+        watcher.start()
+
+    def _watch(self, stop: threading.Event, poll_interval: float) -> None:
+        while not stop.wait(poll_interval):
+            self.reload()
+
+    def _after_fork_in_child(self) -> None:
+        # Only the forking thread survives a fork, the watcher has to be started again. The stop event gets a new
+        # lock, the old one may have been held by the watcher at the time of the fork.
+        if not self._stop.is_set():
+            self._stop = threading.Event()
+            self._start_watcher()
+
+    def _get_file_version(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> OmniConfig:
+        with open(self.path, "rb") as f:
+            content = f.read()
+        data: Any
+        if os.fspath(self.path).endswith(".toml"):
+            if tomllib is None:
+                raise OmniConfigError(
+                    "Reading TOML config files requires Python 3.11+ or the tomli package."
+                )
+            data = tomllib.loads(content.decode("utf-8"))
+        else:
+            data = json.loads(content)
+        if not isinstance(data, dict):
+            raise OmniConfigError(
+                f"Omni config file {self.path} must contain an object at the top level."
+            )
+        if isinstance(data.get("omni"), dict):
+            data = data["omni"]
+        return OmniConfig(
+            required_attrs=self._required_attrs,
+            **{attr: data.get(attr) for attr in CONFIG_ATTRS},
+        )
+
+
 class OmniConfigError(Exception):
     pass
@@ -4,15 +4,51 @@ import base64
 import hashlib
 import hmac
 import json
+import time
 import urllib.parse
 import uuid
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, fields, replace
 from enum import Enum
-from typing import Literal
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping, NamedTuple, Sequence
 
-from .config import OmniConfig, OmniConfigError
+from .cache import CacheBackend, TTLCache
+from .config import OmniConfig, OmniConfigError, OmniConfigSource
+from .profiling import BuildUrlProfile
 from .utils import compact_json_dump
 
+if TYPE_CHECKING:
+    from .client import OmniApiClient
+
+
+# IMPORTANT: The signing blob is the base URL followed by these params in this exact order as documented here
+# https://docs.omni.co/embed/setup/standard-sso#manual-generation
+SIGNED_URL_PARAMS = (
+    "contentPath",
+    "externalId",
+    "name",
+    "nonce",
+    "accessBoost",
+    "connectionRoles",
+    "customTheme",
+    "customThemeId",
+    "email",
+    "entity",
+    "entityFolderContentRole",
+    "entityFolderGroupContentRole",
+    "entityFolderLabel",
+    "entityGroupLabel",
+    "filterSearchParam",
+    "groups",
+    "linkAccess",
+    "mode",
+    "modelRoles",
+    "prefersDark",
+    "preserveEntityFolderContentRole",
+    "theme",
+    "uiSettings",
+    "userAttributes",
+)
+
 
 @dataclass
 class DashboardEmbedUrl:
@@ -43,14 +79,20 @@ class DashboardEmbedUrl:
     userAttributes: str | None = None
     signature: str | None = None
 
+    def params(self) -> dict[str, str]:
+        """Returns the query string params that are set, in the order they are rendered."""
+        params = {}
+        for key in _URL_PARAMS:
+            if (value := getattr(self, key)) is not None:
+                params[key] = value
+        return params
+
     def __str__(self) -> str:
         """String representation renders the complete URL for the embedded dashboard."""
-        params = asdict(self)
-        del params["base_url"]
-        empty_keys = [key for key, value in params.items() if value is None]
-        for key in empty_keys:
-            del params[key]
-        return f"{self.base_url}?{urllib.parse.urlencode(params)}"
+        return f"{self.base_url}?{urllib.parse.urlencode(self.params())}"
+
+
+_URL_PARAMS = [f.name for f in fields(DashboardEmbedUrl) if f.name != "base_url"]
 
 
 class OmniDashboardEmbedder:
@@ -62,10 +104,17 @@ class OmniDashboardEmbedder:
         embed_secret: Omni embed secret. OMNI_EMBED_SECRET environment variable will be used as a fallback.
         vanity_domain: Vanity domain configured with Omni. Should not be fully qualified. OMNI_VANITY_DOMAIN
             environment variable will be used as a fallback.
+        profiler: Optional callback that receives per stage timings and sizes for every `build_url` call. See
+            `omni.profiling.BuildUrlProfileAggregator` for a ready-made profiler.
+        config: Shared configuration to use instead of the other configuration arguments. Either an `OmniConfig`
+            snapshot or an `OmniConfigFile`, in which case a rotated embed secret is picked up without recreating the
+            embedder.
 
     Attributes:
         embed_login_url: Base url of embedded dashboard urls.
-        embed_secret: Omni embed secret.
+        embed_secret: Omni embed secret, read from `config` on every URL build. Assigning a new secret stops changes to
+            the config source from being picked up.
+        profiler: Callback receiving a `BuildUrlProfile` for every `build_url` call, or None to disable profiling.
     """
 
     class AccessMode(Enum):
@@ -127,13 +176,20 @@ class OmniDashboardEmbedder:
         organization_name: str | None = None,
         embed_secret: str | None = None,
         vanity_domain: str | None = None,
+        profiler: Callable[[BuildUrlProfile], None] | None = None,
+        config: OmniConfigSource | None = None,
     ):
-        omni_config = OmniConfig(
-            required_attrs=["embed_secret"],
-            organization_name=organization_name,
-            embed_secret=embed_secret,
-            vanity_domain=vanity_domain,
-        )
+        if config is None:
+            config = OmniConfig(
+                required_attrs=["embed_secret"],
+                organization_name=organization_name,
+                embed_secret=embed_secret,
+                vanity_domain=vanity_domain,
+            )
+        else:
+            config.require(["embed_secret"])
+        self._config = config
+        omni_config = config.current
         if not omni_config.vanity_domain and not omni_config.organization_name:
             raise OmniConfigError(
                 "You must pass the vanity_domain or organization_name arguments OR "
@@ -144,11 +200,21 @@ class OmniDashboardEmbedder:
             or f"{omni_config.organization_name}.embed-omniapp.co"
         )
         self.embed_login_url = f"https://{embed_host}/embed/login"
+        self.profiler = profiler
+
+    @property
+    def embed_secret(self) -> str:
+        # Read from the config source on every access so a hot-reloaded secret takes effect immediately.
+        embed_secret = self._config.current.embed_secret
 
         # Required to appease mypy. If embed_secret is missing an OmniConfigError will have already been raised by the OmniConfig class.
-        assert omni_config.embed_secret
+        assert embed_secret
+        return embed_secret
 
-        self.embed_secret = omni_config.embed_secret
+    @embed_secret.setter
+    def embed_secret(self, embed_secret: str) -> None:
+        # Pins the embedder to a snapshot with the new secret, changes to a config file are no longer picked up.
+        self._config = replace(self._config.current, embed_secret=embed_secret)
 
     def build_url(
         self,
@@ -209,6 +275,11 @@ class OmniDashboardEmbedder:
             str: Signed dashboard embedding URL.
         """
 
+        # Stage timings are only taken when a profiler is set, otherwise each stage costs a single None check.
+        profiler = self.profiler
+        profile = BuildUrlProfile() if profiler is not None else None
+        started = time.perf_counter_ns() if profile is not None else 0
+
         # Preprocess some values before passing to URL object.
         if link_access is True:
             _link_access = "__omni_link_access_open"
@@ -221,23 +292,12 @@ class OmniDashboardEmbedder:
                 "link_access must be a list of dashboard IDs or True to allow links to all dashboards."
             )
 
-        # Convert empty dicts and strings to None.
-        filter_search_params = filter_search_params or None
-        if isinstance(filter_search_params, dict):
-            filter_search_params = urllib.parse.urlencode(
-                filter_search_params, doseq=True
-            )
-
         url = DashboardEmbedUrl(
             base_url=self.embed_login_url,
             contentPath=content_path,
             externalId=external_id,
             name=name,
             accessBoost="true" if access_boost else None,
-            connectionRoles=(
-                compact_json_dump(connection_roles) if connection_roles else None
-            ),
-            customTheme=compact_json_dump(custom_theme) if custom_theme else None,
             customThemeId=custom_theme_id,
             email=email,
             entity=entity,
@@ -251,64 +311,145 @@ class OmniDashboardEmbedder:
             ),
             entityFolderLabel=entity_folder_label,
             entityGroupLabel=entity_group_label,
-            filterSearchParam=filter_search_params,
-            groups=compact_json_dump(groups) if groups else None,
             linkAccess=_link_access,
             mode=mode.value if mode else None,
-            modelRoles=compact_json_dump(model_roles) if model_roles else None,
             prefersDark=prefers_dark.value if prefers_dark else None,
             preserveEntityFolderContentRole=(
                 "true" if preserve_entity_folder_content_role else None
             ),
             theme=theme.value if theme else None,
-            uiSettings=compact_json_dump(ui_settings) if ui_settings else None,
-            userAttributes=(
-                compact_json_dump(user_attributes) if user_attributes else None
-            ),
-            nonce=uuid.uuid4().hex,
+            nonce="",
         )
+        if profile is not None:
+            ended = time.perf_counter_ns()
+            started = profile.record(
+                "preprocess", started, ended, *_sizes(url.params().values())
+            )
+
+        url.connectionRoles = (
+            compact_json_dump(connection_roles) if connection_roles else None
+        )
+        url.customTheme = compact_json_dump(custom_theme) if custom_theme else None
+        url.groups = compact_json_dump(groups) if groups else None
+        url.modelRoles = compact_json_dump(model_roles) if model_roles else None
+        url.uiSettings = compact_json_dump(ui_settings) if ui_settings else None
+        url.userAttributes = (
+            compact_json_dump(user_attributes) if user_attributes else None
+        )
+        if profile is not None:
+            ended = time.perf_counter_ns()
+            json_params = [
+                url.connectionRoles,
+                url.customTheme,
+                url.groups,
+                url.modelRoles,
+                url.uiSettings,
+                url.userAttributes,
+            ]
+            started = profile.record("json", started, ended, *_sizes(json_params))
+
+        # Convert empty dicts and strings to None.
+        filter_search_params = filter_search_params or None
+        if isinstance(filter_search_params, dict):
+            filter_count = len(filter_search_params)
+            filter_search_params = urllib.parse.urlencode(
+                filter_search_params, doseq=True
+            )
+        else:
+            filter_count = 1 if filter_search_params else 0
+        url.filterSearchParam = filter_search_params
+        if profile is not None:
+            ended = time.perf_counter_ns()
+            filter_size = len(filter_search_params or "")
+            started = profile.record(
+                "filters", started, ended, filter_count, filter_size
+            )
+
+        url.nonce = uuid.uuid4().hex
+        if profile is not None:
+            ended = time.perf_counter_ns()
+            started = profile.record("nonce", started, ended, 0, len(url.nonce))
 
         self._sign_url(url)
-        return str(url)
+        if profile is not None:
+            ended = time.perf_counter_ns()
+            signed_count = len(url.params()) - 1
+            signature_size = len(url.signature or "")
+            started = profile.record(
+                "sign", started, ended, signed_count, signature_size
+            )
+
+        url_string = str(url)
+        if profiler is not None and profile is not None:
+            ended = time.perf_counter_ns()
+            profile.record("encode", started, ended, len(url.params()), len(url_string))
+            profile.url_length = len(url_string)
+            profiler(profile)
+        return url_string
+
+    def build_urls(
+        self,
+        content_path: str,
+        external_ids: Sequence[str],
+        names: Sequence[str],
+        filter_search_params: Sequence[str | dict | None] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """Builds signed dashboard embedding URLs for many embed users at once, e.g. with the output of
+        `OmniFilterSet.get_filter_search_params_batch`.
+
+        Args:
+            content_path (str): Path pointing to the dashboard you wish to embed.
+            external_ids (Sequence[str]): Unique ID of each embed user.
+            names (Sequence[str]): Name of each embed user, in the same order as `external_ids`.
+            filter_search_params (Sequence[str | dict], optional): Filters to apply for each embed user, in the same
+                order as `external_ids`.
+            **kwargs: Any other `build_url` arguments. These are applied to every URL.
+
+        Returns:
+            list[str]: Signed dashboard embedding URLs in the same order as `external_ids`.
+        """
+        if len(names) != len(external_ids) or (
+            filter_search_params is not None
+            and len(filter_search_params) != len(external_ids)
+        ):
+            raise ValueError(
+                "names and filter_search_params must be the same length as external_ids."
+            )
+        if filter_search_params is None:
+            filter_search_params = [None] * len(external_ids)
+        return [
+            self.build_url(
+                content_path=content_path,
+                external_id=external_id,
+                name=name,
+                filter_search_params=filters,
+                **kwargs,
+            )
+            for external_id, name, filters in zip(
+                external_ids, names, filter_search_params
+            )
+        ]
 
     def _sign_url(self, url: DashboardEmbedUrl) -> None:
         """Creates a signature and adds it to the URL object."""
+        blob_items = [url.base_url, *(getattr(url, p) for p in SIGNED_URL_PARAMS)]
+        url.signature = sign_blob(
+            self.embed_secret.encode("utf-8"),
+            "\n".join([i for i in blob_items if i is not None]),
+        )
 
-        # IMPORTANT: These must be in the correct order as documented here
-        # https://docs.omni.co/embed/setup/standard-sso#manual-generation
-
-        blob_items = [
-            url.base_url,
-            url.contentPath,
-            url.externalId,
-            url.name,
-            url.nonce,
-            url.accessBoost,
-            url.connectionRoles,
-            url.customTheme,
-            url.customThemeId,
-            url.email,
-            url.entity,
-            url.entityFolderContentRole,
-            url.entityFolderGroupContentRole,
-            url.entityFolderLabel,
-            url.entityGroupLabel,
-            url.filterSearchParam,
-            url.groups,
-            url.linkAccess,
-            url.mode,
-            url.modelRoles,
-            url.prefersDark,
-            url.preserveEntityFolderContentRole,
-            url.theme,
-            url.uiSettings,
-            url.userAttributes,
-        ]
-        blob = "\n".join([i for i in blob_items if i is not None])
-        hmac_hash = hmac.new(
-            self.embed_secret.encode("utf-8"), blob.encode("utf-8"), hashlib.sha256
-        ).digest()
-        url.signature = base64.urlsafe_b64encode(hmac_hash).decode("utf-8")
+
+def _sizes(values: Iterable[str | None]) -> tuple[int, int]:
+    """Returns the number of values that are set and their total length for stage profiling."""
+    present = [v for v in values if v is not None]
+    return len(present), sum(len(v) for v in present)
+
+
+def sign_blob(secret: bytes, blob: str) -> str:
+    """Returns the URL-safe base64 encoded HMAC-SHA256 signature Omni expects for a signing blob."""
+    hmac_hash = hmac.digest(secret, blob.encode("utf-8"), hashlib.sha256)
+    return base64.urlsafe_b64encode(hmac_hash).decode("utf-8")
 
 
 @dataclass
@@ -383,7 +524,10 @@ class OmniFilterDefinition:
         if not isinstance(values, list):
             values = [values]
         filter_key = f"f--{self.field}"
+        filter_value = [json.dumps(self._get_filter_value_param(values))]
+        return filter_key, filter_value
 
+    def _get_filter_value_param(self, values: Any) -> dict[str, Any]:
         is_inclusive = False
 
         operator_kind = self.operator.value
@@ -405,8 +549,38 @@ class OmniFilterDefinition:
         if self.type == self.Type.number:
             filter_value_param["is_inclusive"] = is_inclusive
 
-        filter_value = [json.dumps(filter_value_param)]
-        return filter_key, filter_value
+        return filter_value_param
+
+    def _compile(self) -> _CompiledFilter:
+        """Splits the encoded filter value around its `values` array. Everything else in the filter value is fixed by
+        the definition so it only needs to be encoded once."""
+        placeholder = "__omni_filter_values__"
+        encoded = json.dumps(self._get_filter_value_param(placeholder))
+        prefix, _, suffix = encoded.partition(json.dumps(placeholder))
+        return _CompiledFilter(f"f--{self.field}", prefix, suffix)
+
+
+class _CompiledFilter(NamedTuple):
+    """Precomputed filter search param key and the static JSON surrounding the filter's values."""
+
+    key: str
+    prefix: str
+    suffix: str
+
+    def encode(self, values: Any) -> str:
+        if not isinstance(values, list):
+            values = [values]
+        return f"{self.prefix}{json.dumps(values)}{self.suffix}"
+
+
+_INCLUSIVE_OPERATORS = {
+    OmniFilterDefinition.Operator.greater_than: OmniFilterDefinition.Operator.greater_than_or_equal,
+    OmniFilterDefinition.Operator.less_than: OmniFilterDefinition.Operator.less_than_or_equal,
+}
+
+# Dashboard filter configurations fetched by `OmniFilterSet.from_dashboard`, and the filter sets built from them.
+_dashboard_filters_cache = TTLCache()
+_dashboard_filter_sets: dict[str, tuple[Any, OmniFilterSet]] = {}
 
 
 class OmniFilterSet:
@@ -426,6 +600,7 @@ class OmniFilterSet:
             if not isinstance(value, OmniFilterDefinition):
                 raise TypeError("Filters must be an OmniFilterDefinition object.")
         self._filters = filters
+        self._compiled: dict[str, _CompiledFilter] | None = None
 
     @property
     def filters(self) -> dict[str, OmniFilterDefinition]:
@@ -435,6 +610,95 @@ class OmniFilterSet:
         # Using a property function here to discourage manipulating filters after instantiation.
         return self._filters
 
+    @classmethod
+    def from_dashboard(
+        cls,
+        client: OmniApiClient,
+        dashboard_id: str,
+        ttl: float = 300,
+        cache: CacheBackend | None = None,
+        background_refresh: bool = True,
+    ) -> OmniFilterSet:
+        """Builds a compiled filter set from the filters configured on an Omni dashboard, so filter definitions don't
+        need to be written by hand or kept in sync with the dashboard.
+
+        The dashboard's filter configuration is cached, and by default refreshed in the background before it
+        expires, so only the first call for a dashboard makes a request to the Omni API. Filters are named after their
+        field, e.g. `users.state`. Filters with a type or operator that is not supported by `OmniFilterDefinition` are
+        skipped.
+
+        Args:
+            client: API client used to fetch the dashboard's filters.
+            dashboard_id: ID of the dashboard.
+            ttl: Seconds the dashboard's filter configuration is cached for.
+            cache: Cache for the dashboard's filter configuration. Defaults to an in-memory cache shared by all
+                filter sets. Pass a `TTLCache` with a path to persist the configuration to disk, or a `SQLiteCache`
+                to share it between the processes on a host.
+            background_refresh: Refresh the cached configuration in the background before it expires.
+
+        Returns:
+            : Compiled filter set for the dashboard.
+        """
+        cache = cache if cache is not None else _dashboard_filters_cache
+        key = f"dashboard_filters:{client.base_url}:{dashboard_id}"
+        filters_config = cache.get_or_load(
+            key,
+            lambda: client.get(f"/v1/dashboards/{dashboard_id}/filters"),
+            ttl,
+            background_refresh,
+        )
+
+        # Reuse the filter set built from the same config until the cache reloads it. Caches that deserialize entries
+        # return an equal rather than the same object.
+        cached = _dashboard_filter_sets.get(key)
+        if cached is not None and (
+            cached[0] is filters_config or cached[0] == filters_config
+        ):
+            return cached[1]
+        filter_set = cls._from_filters_config(filters_config).compile()
+        _dashboard_filter_sets[key] = (filters_config, filter_set)
+        return filter_set
+
+    @classmethod
+    def _from_filters_config(cls, filters_config: dict) -> OmniFilterSet:
+        """Translates the filters returned by the dashboard filters endpoint to filter definitions."""
+        filters = {}
+        for config in (filters_config.get("filters") or {}).values():
+            field = config.get("fieldName") or config.get("field")
+            try:
+                filter_type = OmniFilterDefinition.Type(config.get("type"))
+                operator = OmniFilterDefinition.Operator(config.get("kind"))
+            except ValueError:
+                continue
+            if not field:
+                continue
+            if config.get("isInclusive", config.get("is_inclusive")):
+                operator = _INCLUSIVE_OPERATORS.get(operator, operator)
+            filters[field] = OmniFilterDefinition(
+                field=field,
+                type=filter_type,
+                operator=operator,
+                is_negative=bool(config.get("isNegative", config.get("is_negative"))),
+            )
+        return cls(**filters)
+
+    def compile(self) -> OmniFilterSet:
+        """Precomputes the filter search param key and the static parts of the JSON filter value for every filter so
+        that generating filter search params only has to encode the filter values. Recommended for filter sets that
+        are reused across requests. The output of `get_filter_search_params` is identical whether or not the set is
+        compiled. Filter definitions must not be modified after compiling.
+
+        Returns:
+            : This filter set, to allow `OmniFilterSet(...).compile()`.
+        """
+        self._compiled = {name: f._compile() for name, f in self._filters.items()}
+        return self
+
+    def _get_compiled(self) -> dict[str, _CompiledFilter]:
+        if self._compiled is not None:
+            return self._compiled
+        return {name: f._compile() for name, f in self._filters.items()}
+
     def get_filter_search_params(
         self, filter_values: dict[str, str | int | float]
     ) -> dict[str, list[str]]:
@@ -450,8 +714,132 @@ class OmniFilterSet:
             : Dict to be passed as the `filter_search_params` kwarg in the `OmniDashboardEmbedder.build_url` method.
         """
         filter_search_params = {}
+        if self._compiled is not None:
+            for query_param, value in filter_values.items():
+                compiled_filter = self._compiled[query_param]
+                filter_search_params[compiled_filter.key] = [
+                    compiled_filter.encode(value)
+                ]
+            return filter_search_params
+
         for query_param, value in filter_values.items():
             omni_filter = self.filters[query_param]
             filter_key, filter_value = omni_filter.get_filter_search_param_info(value)
             filter_search_params[filter_key] = filter_value
         return filter_search_params
+
+    def encode_query_string(self, query_string: bytes | str) -> str:
+        """Translates a raw query string from the encapsulating application, e.g. `request.query_string` in Flask or
+        `request.url.query` in Starlette, straight to encoded filter search params. This skips building a dict of the
+        query params.
+
+        Params that are repeated (`?state=GA&state=CA`) are combined into a single filter with multiple values. Params
+        that are not in the `filters` property are ignored.
+
+        Args:
+            query_string: Raw query string, without the leading `?`.
+
+        Returns:
+            : Encoded filter search params to be passed as the `filter_search_params` kwarg in the
+                `OmniDashboardEmbedder.build_url` method. Empty if no filters were found.
+        """
+        compiled = self._get_compiled()
+        values: dict[str, list[str]] = {}
+        if isinstance(query_string, bytes):
+            for pair in query_string.split(b"&"):
+                raw_key, _, raw_value = pair.partition(b"=")
+                key = _unquote_plus_bytes(raw_key)
+                if key in compiled:
+                    values.setdefault(key, []).append(_unquote_plus_bytes(raw_value))
+        else:
+            for param in query_string.split("&"):
+                quoted_key, _, quoted_value = param.partition("=")
+                key = urllib.parse.unquote_plus(quoted_key)
+                if key in compiled:
+                    values.setdefault(key, []).append(
+                        urllib.parse.unquote_plus(quoted_value)
+                    )
+
+        return "&".join(
+            f"{urllib.parse.quote_plus(compiled[key].key)}="
+            f"{urllib.parse.quote_plus(compiled[key].encode(key_values))}"
+            for key, key_values in values.items()
+        )
+
+    def get_filter_search_params_batch(
+        self, columns: Mapping[str, Sequence[Any]]
+    ) -> list[str]:
+        """Columnar version of `get_filter_search_params` for generating filter search params for many rows at once,
+        e.g. every row of a table. Work is done per column rather than per row: JSON encoding of scalar values is done
+        for a whole column in a single call, and repeated values are only URL encoded once.
+
+        Args:
+            columns: Dict where the keys are filter names and the values are equal length sequences (lists, tuples or
+                NumPy arrays) of the values to filter on, one per row.
+
+        Returns:
+            : URL encoded filter search params for each row. These can be passed as the `filter_search_params` of
+                `OmniDashboardEmbedder.build_urls` and are identical to `urlencode`-ing the output of
+                `get_filter_search_params` for that row.
+        """
+        compiled = self._get_compiled()
+        row_count = None
+        encoded_columns = []
+        for name, column in columns.items():
+            # Converts NumPy arrays (or anything else array-like) to Python scalars in a single call.
+            values = column.tolist() if hasattr(column, "tolist") else list(column)
+            if row_count is None:
+                row_count = len(values)
+            elif len(values) != row_count:
+                raise ValueError("All filter columns must be the same length.")
+            encoded_column = _encode_filter_column(compiled[name], values)
+            if len(encoded_column) != row_count:
+                # Checked in optimized mode too, zipping the columns would silently pair values with the wrong rows.
+                raise ValueError(
+                    f"Filter {name!r} was encoded to {len(encoded_column)} values for {row_count} rows."
+                )
+            encoded_columns.append(encoded_column)
+
+        if not encoded_columns:
+            return []
+        return ["&".join(row) for row in zip(*encoded_columns)]
+
+
+def _unquote_plus_bytes(value: bytes) -> str:
+    return urllib.parse.unquote_to_bytes(value.replace(b"+", b" ")).decode(
+        "utf-8", "replace"
+    )
+
+
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def _encode_filter_column(compiled_filter: _CompiledFilter, values: list) -> list[str]:
+    """URL encodes a column of filter values as `key=value` pairs."""
+    if not values:
+        return []
+    # Percent encoding is done per character, so the static parts of the pair are only encoded once.
+    quoted_prefix = urllib.parse.quote_plus(compiled_filter.key) + "="
+    quoted_prefix += urllib.parse.quote_plus(compiled_filter.prefix + "[")
+    quoted_suffix = urllib.parse.quote_plus("]" + compiled_filter.suffix)
+
+    if all(v is None or isinstance(v, _SCALAR_TYPES) for v in values):
+        # Newlines are always escaped inside encoded JSON scalars, so they can safely separate the values of a column
+        # encoded in a single call. Containers are encoded with separators of their own and can't be split this way.
+        encoded_values = json.dumps(values, separators=("\n", ": "))[1:-1].split("\n")
+    else:
+        # Same encoding as `_CompiledFilter.encode`, minus the brackets of the values array.
+        encoded_values = [
+            json.dumps(v)[1:-1] if isinstance(v, list) else json.dumps(v)
+            for v in values
+        ]
+
+    quoted: dict[str, str] = {}
+    pairs = []
+    for encoded_value in encoded_values:
+        if (quoted_value := quoted.get(encoded_value)) is None:
+            quoted_value = quoted[encoded_value] = urllib.parse.quote_plus(
+                encoded_value
+            )
+        pairs.append(f"{quoted_prefix}{quoted_value}{quoted_suffix}")
+    return pairs
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, NamedTuple
+
+from .embed import OmniDashboardEmbedder
+
+
+@dataclass
+class EmbedUrlPoolStats:
+    """Counters of an `EmbedUrlPool`.
+
+    Attributes:
+        hits: URLs handed out from the pool.
+        misses: URLs built inline because the pool had none for the request.
+        expired: Pooled URLs discarded because they were too old or signed with a rotated secret.
+        generated: URLs built in the background to fill the pool.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    generated: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+class _PooledUrl(NamedTuple):
+    minted_at: float
+    embed_secret: str
+    url: str
+
+
+class EmbedUrlPool:
+    """Pool of pre-signed, single-use embed URLs for `OmniDashboardEmbedder`. URLs are built in the background ahead of
+    time, so handing one out on page render costs a dictionary lookup instead of a `build_url` call.
+
+    Call `prime` when a session starts to build `size` URLs for a user and content path, then `get` whenever the page
+    renders. Every URL has its own nonce and is handed out at most once. URLs older than `max_age`, or signed with an
+    embed secret that has since been rotated, are discarded. When the pool has no URL for a request it is built inline
+    and counted as a miss. Each `get` tops the pool for that request back up in the background.
+
+    Args:
+        embedder: Embedder used to build the URLs.
+        size: Number of URLs kept ready per user and content path.
+        max_age: Seconds after which a pooled URL is discarded. Must be shorter than the window in which Omni accepts
+            a URL's nonce.
+        max_keys: Maximum number of users and content paths kept in the pool. The least recently used are evicted.
+        threads: Number of background threads building URLs.
+
+    Attributes:
+        stats: Hit, miss, expiry and generation counters.
+    """
+
+    def __init__(
+        self,
+        embedder: OmniDashboardEmbedder,
+        size: int = 3,
+        max_age: float = 240.0,
+        max_keys: int = 10_000,
+        threads: int = 2,
+    ) -> None:
+        self.embedder = embedder
+        self.size = size
+        self.max_age = max_age
+        self.max_keys = max_keys
+        self.stats = EmbedUrlPoolStats()
+        self._lock = threading.Lock()
+        self._urls: OrderedDict[str, deque[_PooledUrl]] = OrderedDict()
+        self._kwargs: dict[str, dict[str, Any]] = {}
+        self._refilling: set[str] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="omni-embed-pool"
+        )
+
+    def prime(
+        self, content_path: str, external_id: str, name: str, **kwargs: Any
+    ) -> None:
+        """Starts building URLs in the background for a user and content path, e.g. when the user's session starts.
+        Takes the same arguments as `OmniDashboardEmbedder.build_url`."""
+        kwargs.update(content_path=content_path, external_id=external_id, name=name)
+        key = _get_key(kwargs)
+        with self._lock:
+            self._touch(key, kwargs)
+        self._schedule_refill(key)
+
+    def get(self, content_path: str, external_id: str, name: str, **kwargs: Any) -> str:
+        """Returns a signed URL, from the pool when one is available and otherwise built inline. Takes the same
+        arguments as `OmniDashboardEmbedder.build_url`.
+
+        Returns:
+            : Signed dashboard embedding URL that hasn't been handed out before.
+        """
+        kwargs.update(content_path=content_path, external_id=external_id, name=name)
+        key = _get_key(kwargs)
+        url = None
+        with self._lock:
+            urls = self._touch(key, kwargs)
+            now = time.monotonic()
+            embed_secret = self.embedder.embed_secret
+            while urls:
+                pooled = urls.popleft()
+                if (
+                    now - pooled.minted_at < self.max_age
+                    and pooled.embed_secret == embed_secret
+                ):
+                    url = pooled.url
+                    self.stats.hits += 1
+                    break
+                self.stats.expired += 1
+            else:
+                self.stats.misses += 1
+        self._schedule_refill(key)
+        return url if url is not None else self.embedder.build_url(**kwargs)
+
+    def evict(
+        self, content_path: str, external_id: str, name: str, **kwargs: Any
+    ) -> None:
+        """Drops the pooled URLs of a user and content path, e.g. when the user's session ends. Takes the same
+        arguments as `OmniDashboardEmbedder.build_url`."""
+        kwargs.update(content_path=content_path, external_id=external_id, name=name)
+        key = _get_key(kwargs)
+        with self._lock:
+            self._urls.pop(key, None)
+            self._kwargs.pop(key, None)
+
+    def close(self) -> None:
+        """Stops building URLs in the background and empties the pool."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._urls.clear()
+            self._kwargs.clear()
+
+    def _touch(self, key: str, kwargs: dict[str, Any]) -> deque[_PooledUrl]:
+        urls = self._urls.get(key)
+        if urls is None:
+            urls = self._urls[key] = deque()
+            self._kwargs[key] = kwargs
+            while len(self._urls) > self.max_keys:
+                evicted, _ = self._urls.popitem(last=False)
+                self._kwargs.pop(evicted, None)
+        else:
+            self._urls.move_to_end(key)
+        return urls
+
+    def _schedule_refill(self, key: str) -> None:
+        with self._lock:
+            if key in self._refilling:
+                return
+            self._refilling.add(key)
+        try:
+            self._executor.submit(self._refill, key)
+        except RuntimeError:
+            # The pool has been closed.
+            with self._lock:
+                self._refilling.discard(key)
+
+    def _refill(self, key: str) -> None:
+        try:
+            while True:
+                with self._lock:
+                    urls = self._urls.get(key)
+                    kwargs = self._kwargs.get(key)
+                    if urls is None or kwargs is None or len(urls) >= self.size:
+                        return
+                embed_secret = self.embedder.embed_secret
+                url = self.embedder.build_url(**kwargs)
+                with self._lock:
+                    # The key may have been evicted while the URL was built.
+                    if self._urls.get(key) is not urls:
+                        return
+                    urls.append(_PooledUrl(time.monotonic(), embed_secret, url))
+                    self.stats.generated += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+
+def _get_key(kwargs: dict[str, Any]) -> str:
+    return json.dumps(
+        kwargs,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=lambda value: value.value if isinstance(value, Enum) else str(value),
+    )
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Generic, TypeVar, cast, overload
+
+from .utils import compact_json_dump
+
+T = TypeVar("T")
+M = TypeVar("M", bound="_Model")
+
+
+class _Field(Generic[T]):
+    """Descriptor for a field of a response model. The model's raw JSON is decoded on first access to any field, and
+    every field is kept in a slot named after its attribute with a leading underscore.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.slot = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.slot = f"_{name}"
+
+    @overload
+    def __get__(self, obj: None, owner: type | None = None) -> _Field[T]: ...
+
+    @overload
+    def __get__(self, obj: _Model, owner: type | None = None) -> T: ...
+
+    def __get__(self, obj: _Model | None, owner: type | None = None) -> _Field[T] | T:
+        if obj is None:
+            return self
+        try:
+            return cast(T, getattr(obj, self.slot))
+        except AttributeError:
+            pass
+        obj._decode()
+        return cast(T, getattr(obj, self.slot))
+
+
+class _Model:
+    """Base class of lazily decoded response models. Wraps a single resource as raw JSON bytes or a decoded dict.
+    Subclasses declare their fields as `_Field` class attributes with a matching `__slots__` entry.
+    """
+
+    __slots__ = ("_raw",)
+
+    _fields: tuple[_Field[Any], ...] = ()
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        cls._fields = tuple(
+            value for value in vars(cls).values() if isinstance(value, _Field)
+        )
+
+    def __init__(self, raw: bytes | dict[str, Any]) -> None:
+        self._raw = raw
+
+    @classmethod
+    def from_dict(cls: type[M], data: dict[str, Any]) -> M:
+        """Creates a model holding the resource as compact JSON bytes, which take up a fraction of the memory of the
+        decoded dict."""
+        return cls(compact_json_dump(data).encode("utf-8"))
+
+    def _decode(self) -> None:
+        """Decodes the raw JSON once and fills the slots of all fields. The decoded object itself is not kept, only
+        `to_dict` decodes the full resource again."""
+        raw = self._raw
+        data: dict[str, Any] = json.loads(raw) if isinstance(raw, bytes) else raw
+        for field in self._fields:
+            setattr(self, field.slot, data.get(field.key))
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the full decoded resource."""
+        raw = self._raw
+        return json.loads(raw) if isinstance(raw, bytes) else dict(raw)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        assert isinstance(other, _Model)
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r})"
+
+
+class ScimUser(_Model):
+    """Omni user returned by the SCIM API. Fields are decoded on first access to any of them."""
+
+    __slots__ = (
+        "_id",
+        "_user_name",
+        "_display_name",
+        "_active",
+        "_emails",
+        "_groups",
+        "_meta",
+    )
+
+    id: _Field[str | None] = _Field("id")
+    user_name: _Field[str | None] = _Field("userName")
+    display_name: _Field[str | None] = _Field("displayName")
+    active: _Field[bool | None] = _Field("active")
+    emails: _Field[list[dict[str, Any]] | None] = _Field("emails")
+    groups: _Field[list[dict[str, Any]] | None] = _Field("groups")
+    meta: _Field[dict[str, Any] | None] = _Field("meta")
+
+
+class ScimGroup(_Model):
+    """Omni group returned by the SCIM API. Fields are decoded on first access to any of them."""
+
+    __slots__ = ("_id", "_display_name", "_members", "_meta")
+
+    id: _Field[str | None] = _Field("id")
+    display_name: _Field[str | None] = _Field("displayName")
+    members: _Field[list[dict[str, Any]] | None] = _Field("members")
+    meta: _Field[dict[str, Any] | None] = _Field("meta")
+
+
+class Document(_Model):
+    """Omni document (workbook or dashboard) returned by the documents API. Fields are decoded on first access to any of
+    them."""
+
+    __slots__ = (
+        "_id",
+        "_name",
+        "_type",
+        "_scope",
+        "_owner",
+        "_folder",
+        "_connection_id",
+        "_has_dashboard",
+        "_labels",
+        "_updated_at",
+    )
+
+    id: _Field[str | None] = _Field("identifier")
+    name: _Field[str | None] = _Field("name")
+    type: _Field[str | None] = _Field("type")
+    scope: _Field[str | None] = _Field("scope")
+    owner: _Field[dict[str, Any] | None] = _Field("owner")
+    folder: _Field[dict[str, Any] | None] = _Field("folder")
+    connection_id: _Field[str | None] = _Field("connectionId")
+    has_dashboard: _Field[bool | None] = _Field("hasDashboard")
+    labels: _Field[list[dict[str, Any]] | None] = _Field("labels")
+    updated_at: _Field[str | None] = _Field("updatedAt")
+
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def split_page(raw: bytes, key: str) -> tuple[dict[str, Any], list[bytes]]:
+    """Splits a JSON object holding a page of resources into the raw JSON bytes of each resource, without decoding
+    and re-encoding them. Each resource is parsed once to find where it ends, at about the cost of a single `json.loads`
+    of the page.
+
+    Args:
+        raw: JSON object, e.g. a SCIM list response.
+        key: Key of the array of resources, e.g. `Resources`.
+
+    Returns:
+        : The other keys of the page, decoded, and the raw JSON of each resource.
+    """
+    text = raw.decode("utf-8")
+    page: dict[str, Any] = {}
+    items: list[bytes] = []
+    pos = _expect(text, 0, "{")
+    if text.startswith("}", pos):
+        return page, items
+    while True:
+        name, pos = _decoder.raw_decode(text, pos)
+        pos = _expect(text, pos, ":")
+        if name == key and text.startswith("[", pos):
+            pos = _skip_whitespace(text, pos + 1)
+            closed = text.startswith("]", pos)
+            if closed:
+                pos += 1
+            while not closed:
+                start = pos
+                _, pos = _decoder.raw_decode(text, pos)
+                items.append(text[start:pos].encode("utf-8"))
+                pos, closed = _expect_separator(text, pos, "]")
+        else:
+            page[name], pos = _decoder.raw_decode(text, pos)
+        pos, closed = _expect_separator(text, pos, "}")
+        if closed:
+            return page, items
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    match = _whitespace.match(text, pos)
+    assert match is not None
+    return match.end()
+
+
+def _expect(text: str, pos: int, char: str) -> int:
+    """Skips whitespace and `char`, returning the position of the next value."""
+    pos = _skip_whitespace(text, pos)
+    if not text.startswith(char, pos):
+        raise json.JSONDecodeError(f"Expecting {char!r}", text, pos)
+    return _skip_whitespace(text, pos + 1)
+
+
+def _expect_separator(text: str, pos: int, end: str) -> tuple[int, bool]:
+    """Skips a comma or the closing `end` character, returning the next position and whether `end` was found."""
+    pos = _skip_whitespace(text, pos)
+    if text.startswith(end, pos):
+        return pos + 1, True
+    return _expect(text, pos, ","), False
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class StageTiming:
+    """Timing of a single stage of `OmniDashboardEmbedder.build_url`.
+
+    Stages, in order:
+
+    - `preprocess`: Converting plain arguments (enums, flags, link access) to URL params.
+    - `json`: Serializing dict and list arguments to compact JSON.
+    - `filters`: URL encoding the filter search params.
+    - `nonce`: Generating the nonce.
+    - `sign`: HMAC signing the URL params.
+    - `encode`: Rendering the final URL.
+
+    Attributes:
+        stage: Name of the stage.
+        duration_ns: Time spent in the stage in nanoseconds.
+        input_size: Number of values the stage consumed.
+        output_size: Number of characters the stage produced.
+    """
+
+    stage: str
+    duration_ns: int
+    input_size: int
+    output_size: int
+
+
+@dataclass
+class BuildUrlProfile:
+    """Per stage timings of a single `OmniDashboardEmbedder.build_url` call passed to the embedder's profiler.
+
+    Attributes:
+        stages: Timings for each stage in the order they ran.
+        url_length: Length of the final URL.
+    """
+
+    stages: list[StageTiming] = field(default_factory=list)
+    url_length: int = 0
+
+    @property
+    def total_ns(self) -> int:
+        """Time spent in all stages in nanoseconds."""
+        return sum(s.duration_ns for s in self.stages)
+
+    def record(
+        self,
+        stage: str,
+        started_ns: int,
+        ended_ns: int,
+        input_size: int,
+        output_size: int,
+    ) -> int:
+        """Records a stage and returns the start time of the next stage."""
+        self.stages.append(
+            StageTiming(stage, ended_ns - started_ns, input_size, output_size)
+        )
+        # Taken after recording so the profiling bookkeeping isn't attributed to the next stage.
+        return time.perf_counter_ns()
+
+
+@dataclass
+class StageSummary:
+    """Aggregated timings for one stage.
+
+    Attributes:
+        count: Number of calls recorded.
+        total_ns: Total time spent in the stage in nanoseconds.
+        min_ns: Fastest call in nanoseconds.
+        max_ns: Slowest call in nanoseconds.
+        histogram: Number of calls per duration bucket. Keys are the bucket's upper bound in nanoseconds, each bucket
+            twice the size of the previous one.
+    """
+
+    count: int = 0
+    total_ns: int = 0
+    min_ns: int = 0
+    max_ns: int = 0
+    histogram: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def mean_ns(self) -> float:
+        """Mean time spent in the stage in nanoseconds."""
+        return self.total_ns / self.count if self.count else 0.0
+
+    def add(self, duration_ns: int) -> None:
+        self.min_ns = min(self.min_ns, duration_ns) if self.count else duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.count += 1
+        self.total_ns += duration_ns
+        bucket = 1 << max(duration_ns - 1, 0).bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+
+class BuildUrlProfileAggregator:
+    """Profiler for `OmniDashboardEmbedder` that aggregates per stage histograms across calls. Safe to share between
+    threads.
+
+    Example:
+        ```python
+        aggregator = BuildUrlProfileAggregator()
+        embedder = OmniDashboardEmbedder(..., profiler=aggregator)
+        ...
+        aggregator.summary()["sign"].histogram
+        ```
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: dict[str, StageSummary] = {}
+
+    def __call__(self, profile: BuildUrlProfile) -> None:
+        with self._lock:
+            for timing in profile.stages:
+                if timing.stage not in self._stages:
+                    self._stages[timing.stage] = StageSummary()
+                self._stages[timing.stage].add(timing.duration_ns)
+
+    def summary(self) -> dict[str, StageSummary]:
+        """Returns a copy of the aggregated timings keyed by stage name."""
+        with self._lock:
+            return {
+                stage: StageSummary(
+                    s.count, s.total_ns, s.min_ns, s.max_ns, dict(s.histogram)
+                )
+                for stage, s in self._stages.items()
+            }
+
+    def reset(self) -> None:
+        """Clears all aggregated timings."""
+        with self._lock:
+            self._stages = {}
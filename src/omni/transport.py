@@ -0,0 +1,673 @@
+from __future__ import annotations
+
+import functools
+import gzip
+import importlib.metadata
+import json
+import logging
+import os
+import queue
+import threading
+import urllib.parse
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableSequence,
+    TypeVar,
+    Union,
+)
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .utils import reset_after_fork
+
+# Request bodies that can be sent as is: bytes, a binary file-like object or an iterable of byte chunks.
+RequestBody = Union[bytes, IO[bytes], Iterable[bytes]]
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+P = TypeVar("P")
+
+# `warmup` swaps connections in and out of the queue of idle connections of urllib3 connection pools, which is private
+# API. The layout it relies on, a `LifoQueue` of connections and empty `None` slots that `_new_conn` creates
+# connections for, is the same in urllib3 1.26 and 2.x, the versions supported by requests. Warmup is skipped with
+# other versions, or if the layout isn't found.
+_URLLIB3_VERSION = importlib.metadata.version("urllib3")
+_WARMUP_SUPPORTED = (
+    (1, 26)
+    <= tuple(int(part) for part in _URLLIB3_VERSION.split(".")[:2] if part.isdigit())
+    < (3, 0)
+)
+
+# Connection errors are raised right away, wrapped in MaxRetryError, and redirects are returned rather than followed.
+_NO_RETRIES = urllib3.Retry(
+    total=0, read=False, redirect=False, raise_on_redirect=False
+)
+
+
+class OmniHTTPError(requests.HTTPError):
+    """Raised for 4xx and 5xx responses, whichever transport the client uses. Subclasses `requests.HTTPError` so
+    existing error handling keeps working. `response` is a `requests.Response`, built from the `TransportResponse` by
+    `TransportResponse.to_requests_response`."""
+
+
+@dataclass
+class TransportResponse:
+    """HTTP response returned by a `Transport`.
+
+    Streamed responses hold the connection until the body has been read with `read` or `iter_content`, or the
+    response is closed.
+
+    Attributes:
+        status_code: HTTP status code.
+        headers: Response headers. Lookups are case-insensitive.
+        content: Response body. Empty for streamed responses until `read` is called.
+        url: URL of the request.
+        reason: HTTP reason phrase.
+        request: The request that was sent. Set by the built-in transports for all responses of `RequestsTransport`
+            and for error responses of the others.
+        chunks: Unread body chunks of a streamed response, None once read or if the response wasn't streamed.
+        on_close: Called once when a streamed response is closed, to release its connection.
+    """
+
+    status_code: int
+    headers: Mapping[str, str] = field(default_factory=CaseInsensitiveDict)
+    content: bytes = b""
+    url: str = ""
+    reason: str = ""
+    request: requests.PreparedRequest | None = field(default=None, repr=False)
+    chunks: Iterator[bytes] | None = field(default=None, repr=False)
+    on_close: Callable[[], None] | None = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if type(self.headers) is dict:
+            self.headers = CaseInsensitiveDict(self.headers)
+
+    @property
+    def ok(self) -> bool:
+        """False for 4xx and 5xx responses."""
+        return self.status_code < 400
+
+    @property
+    def encoding(self) -> str:
+        """Charset of the Content-Type header, or UTF-8 if it has none."""
+        return requests.utils.get_encoding_from_headers(self.headers) or "utf-8"
+
+    @property
+    def text(self) -> str:
+        """The body decoded with `encoding`. Reads the rest of a streamed response."""
+        return self.read().decode(self.encoding, errors="replace")
+
+    def read(self) -> bytes:
+        """Reads the remaining body of a streamed response into `content` and returns it."""
+        if self.chunks is not None:
+            chunks, self.chunks = self.chunks, None
+            try:
+                self.content = b"".join(chunks)
+            finally:
+                self.close()
+        return self.content
+
+    def iter_content(self) -> Iterator[bytes]:
+        """Yields the body in chunks as it is received, without holding all of it in memory. Can only be iterated
+        once for streamed responses."""
+        if self.chunks is None:
+            if self.content:
+                yield self.content
+            return
+        chunks, self.chunks = self.chunks, None
+        try:
+            yield from chunks
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Releases the connection of a streamed response without reading the rest of the body."""
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
+
+    def json(self) -> Any:
+        """Decodes the response body as JSON. Raises `requests.JSONDecodeError` for invalid bodies, like
+        `requests.Response.json`."""
+        try:
+            return json.loads(self.read())
+        except json.JSONDecodeError as e:
+            raise requests.JSONDecodeError(e.msg, e.doc, e.pos) from e
+        except UnicodeDecodeError as e:
+            raise requests.JSONDecodeError(str(e), "", 0) from e
+
+    def raise_for_status(self) -> None:
+        """Raises `OmniHTTPError` for 4xx and 5xx responses. The error's `response` is a `requests.Response` with the
+        same status, headers, body and request, as for errors raised by `requests`."""
+        if 400 <= self.status_code < 600:
+            # Error bodies are small, reading them releases the connection of a streamed response.
+            self.read()
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise OmniHTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                response=self.to_requests_response(),
+            )
+
+    def to_requests_response(self) -> requests.Response:
+        """Converts the response to a `requests.Response`, reading the rest of the body of a streamed response."""
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.read()
+        response.url = self.url
+        response.reason = self.reason
+        response.encoding = self.encoding
+        if self.request is not None:
+            response.request = self.request
+        return response
+
+
+class Transport(ABC):
+    """Sends the HTTP requests of an `OmniApiClient`. Implementations must be safe to use from multiple threads."""
+
+    @abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: RequestBody | None = None,
+        stream: bool = False,
+        decode_content: bool = True,
+    ) -> TransportResponse:
+        """Sends a request.
+
+        Args:
+            method: HTTP method.
+            url: Full URL including the query string.
+            headers: Request headers.
+            body: Request body. File-like objects and iterables of chunks should be streamed.
+            stream: Return as soon as the headers are received, with the body in `TransportResponse.chunks`.
+                Transports that receive the whole body at once may ignore it.
+            decode_content: Decompress bodies sent with a `Content-Encoding` such as gzip. When False the body is
+                returned as received, matching the `Content-Encoding` and `Content-Length` headers.
+
+        Returns:
+            : The response. Error statuses are returned rather than raised.
+
+        Raises:
+            requests.RequestException: If no response was received, e.g. `requests.ConnectionError`.
+        """
+
+    def close(self) -> None:
+        """Closes any pooled connections. The transport can still be used afterwards."""
+
+    def warmup(self, url: str, connections: int) -> int:
+        """Opens pooled keep-alive connections to the host of `url` ahead of the first request, and reopens idle ones
+        that the server has closed. Connections in use by requests are not touched. Transports without a connection
+        pool do nothing. The pooled transports support warming up with urllib3 1.26 and 2.x, with other versions they
+        log a warning and do nothing.
+
+        Args:
+            url: URL of the host to connect to.
+            connections: Number of connections that should be open once warmed up.
+
+        Returns:
+            : Number of connections that were opened.
+        """
+        return 0
+
+
+class _PooledTransport(Transport, Generic[P]):
+    """Base class of transports that keep a connection pool per process. The pool is created lazily on first use in
+    each process, so a transport created before forking worker processes never shares sockets with its parent.
+    """
+
+    def __init__(self, max_connections: int = 10) -> None:
+        self.max_connections = max_connections
+        self._pool: P | None = None
+        self._pool_pid: int | None = None
+        self._pool_lock = threading.Lock()
+        reset_after_fork(self)
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._close_pool(self._pool)
+            self._pool = None
+
+    def warmup(self, url: str, connections: int) -> int:
+        connection_pool = self._get_connection_pool(self._get_pool(), url)
+        slots = _get_idle_connections(connection_pool)
+        if slots is None:
+            logger.warning(
+                "Skipping warmup, not supported with urllib3 %s.", _URLLIB3_VERSION
+            )
+            return 0
+        # Connections are never taken out of the pool. Slots are swapped in place under the queue's lock instead, so
+        # requests running at the same time always find as many slots as before and never open and then discard
+        # connections of their own.
+        with slots.mutex:
+            idle = list(slots.queue)
+        dead = {
+            id(conn): conn
+            for conn in idle
+            if conn is not None
+            and (
+                conn.sock is None or urllib3.util.connection.is_connection_dropped(conn)
+            )
+        }
+        removed = []
+        with slots.mutex:
+            # Connections closed by the server while idle become empty slots, to be filled below. Those taken by a
+            # request since the snapshot are the request's to reconnect.
+            for i, conn in enumerate(slots.queue):
+                if id(conn) in dead:
+                    removed.append(conn)
+                    slots.queue[i] = None
+            _move_empty_slots_down(slots.queue)
+            in_use = slots.maxsize - len(slots.queue)
+            open_idle = sum(conn is not None for conn in slots.queue)
+            empty = len(slots.queue) - open_idle
+        for conn in removed:
+            conn.close()
+        new = min(max(min(connections, slots.maxsize) - in_use - open_idle, 0), empty)
+        if not new:
+            return 0
+
+        # _new_conn builds connections the way the pool does, with its TLS and proxy settings.
+        opened = [connection_pool._new_conn() for _ in range(new)]
+        try:
+            with ThreadPoolExecutor(max_workers=new) as executor:
+                list(executor.map(lambda conn: conn.connect(), opened))
+        except (OSError, urllib3.exceptions.HTTPError) as e:
+            for conn in opened:
+                conn.close()
+            raise requests.ConnectionError(e) from e
+        placed = 0
+        with slots.mutex:
+            for i, conn in enumerate(slots.queue):
+                if conn is None and placed < new:
+                    slots.queue[i] = opened[placed]
+                    placed += 1
+            _move_empty_slots_down(slots.queue)
+        # Requests may have taken some of the empty slots in the meantime.
+        for conn in opened[placed:]:
+            conn.close()
+        return placed
+
+    @abstractmethod
+    def _create_pool(self) -> P: ...
+
+    @abstractmethod
+    def _get_connection_pool(self, pool: P, url: str) -> Any:
+        """Returns the urllib3 connection pool `pool` sends requests to `url` through."""
+
+    @abstractmethod
+    def _close_pool(self, pool: P) -> None: ...
+
+    def _get_pool(self) -> P:
+        """Returns this process's connection pool, creating it on first use in each process."""
+        pool = self._pool
+        if pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    # A pool inherited from a parent process is abandoned rather than closed, closing it would close
+                    # sockets the parent is still using.
+                    self._pool = self._create_pool()
+                    self._pool_pid = os.getpid()
+                pool = self._pool
+        return pool
+
+    def _after_fork_in_child(self) -> None:
+        # The lock may have been held by another thread at the time of the fork, in which case it would never be
+        # released in the child.
+        self._pool_lock = threading.Lock()
+        self._pool = None
+
+
+class RequestsTransport(_PooledTransport[requests.Session]):
+    """Transport using a `requests.Session`. The default transport.
+
+    Args:
+        max_connections: Maximum number of keep-alive connections kept open per process.
+    """
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: RequestBody | None = None,
+        stream: bool = False,
+        decode_content: bool = True,
+    ) -> TransportResponse:
+        response = self._get_pool().request(
+            method=method,
+            url=url,
+            headers=headers,
+            data=body,
+            stream=stream or not decode_content,
+        )
+        if stream or not decode_content:
+            streamed = TransportResponse(
+                status_code=response.status_code,
+                headers=response.headers,
+                url=response.url,
+                reason=response.reason,
+                request=response.request,
+                chunks=(
+                    response.iter_content(STREAM_CHUNK_SIZE)
+                    if decode_content
+                    # Read from urllib3 directly, requests always decodes.
+                    else _stream_urllib3(response.raw, decode_content=False)
+                ),
+                on_close=response.close,
+            )
+            if not stream:
+                streamed.read()
+            return streamed
+        return TransportResponse(
+            status_code=response.status_code,
+            headers=response.headers,
+            content=response.content,
+            url=response.url,
+            reason=response.reason,
+            request=response.request,
+        )
+
+    def _create_pool(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _close_pool(self, pool: requests.Session) -> None:
+        pool.close()
+
+    def _get_connection_pool(self, pool: requests.Session, url: str) -> Any:
+        adapter = pool.get_adapter(url)
+        assert isinstance(adapter, HTTPAdapter)
+        # Resolved the same way as for a request, so the TLS settings and proxies select the same connection pool that
+        # requests will use.
+        settings = pool.merge_environment_settings(url, {}, None, None, None)
+        if not hasattr(adapter, "get_connection_with_tls_context"):
+            # requests < 2.32
+            return adapter.get_connection(url, settings["proxies"])
+        return adapter.get_connection_with_tls_context(
+            requests.Request("GET", url).prepare(),
+            settings["verify"],
+            settings["proxies"],
+            settings["cert"],
+        )
+
+
+class Urllib3Transport(_PooledTransport[urllib3.PoolManager]):
+    """Transport using urllib3 directly, skipping the per request overhead of `requests`. Redirects are not followed.
+    Connection errors and timeouts are raised as their `requests` counterparts.
+
+    Args:
+        max_connections: Maximum number of keep-alive connections kept open per process.
+        timeout: Connect and read timeout in seconds, or None to wait indefinitely.
+    """
+
+    def __init__(self, max_connections: int = 10, timeout: float | None = None) -> None:
+        super().__init__(max_connections)
+        self.timeout = timeout
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: RequestBody | None = None,
+        stream: bool = False,
+        decode_content: bool = True,
+    ) -> TransportResponse:
+        chunked = body is not None and not isinstance(
+            body, (bytes, bytearray, memoryview)
+        )
+        if chunked and hasattr(body, "read"):
+            body = iter(functools.partial(body.read, STREAM_CHUNK_SIZE), b"")  # type: ignore[union-attr]
+        try:
+            response = self._get_pool().urlopen(
+                method,
+                url,
+                body=body,
+                headers=dict(headers),
+                chunked=chunked,
+                retries=_NO_RETRIES,
+                timeout=urllib3.Timeout(total=self.timeout),
+                preload_content=not stream,
+                decode_content=decode_content,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            reason = getattr(e, "reason", None) or e
+            # NewConnectionError subclasses ConnectTimeoutError for historical reasons.
+            if isinstance(reason, urllib3.exceptions.TimeoutError) and not isinstance(
+                reason, urllib3.exceptions.NewConnectionError
+            ):
+                raise requests.Timeout(e) from e
+            raise requests.ConnectionError(e) from e
+        if stream:
+            return TransportResponse(
+                status_code=response.status,
+                headers=response.headers,
+                url=url,
+                reason=response.reason or "",
+                request=_error_request(response.status, method, url, headers),
+                chunks=_stream_urllib3(response, decode_content),
+                on_close=functools.partial(_close_urllib3, response),
+            )
+        return TransportResponse(
+            status_code=response.status,
+            headers=response.headers,
+            content=response.data,
+            url=url,
+            reason=response.reason or "",
+            request=_error_request(response.status, method, url, headers),
+        )
+
+    def _create_pool(self) -> urllib3.PoolManager:
+        return urllib3.PoolManager(num_pools=1, maxsize=self.max_connections)
+
+    def _close_pool(self, pool: urllib3.PoolManager) -> None:
+        pool.clear()
+
+    def _get_connection_pool(self, pool: urllib3.PoolManager, url: str) -> Any:
+        return pool.connection_from_url(url)
+
+
+@dataclass
+class TransportRequest:
+    """Request received by an `InMemoryTransport` handler.
+
+    Attributes:
+        method: HTTP method.
+        url: Full URL including the query string.
+        path: URL path relative to the transport's `base_path`.
+        params: Query string parameters. Each parameter maps to the list of its values.
+        headers: Request headers. Lookups are case-insensitive.
+        body: Request body, with streamed bodies read into memory. Not decompressed.
+    """
+
+    method: str
+    url: str
+    path: str
+    params: dict[str, list[str]]
+    headers: Mapping[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        """Decodes the request body as JSON, decompressing it first if it was gzipped."""
+        body = self.body
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body)
+
+
+# Handlers return either a full response or a JSON-serializable object, which is sent as a 200 response.
+Handler = Callable[[TransportRequest], Any]
+
+
+class InMemoryTransport(Transport):
+    """Transport that dispatches requests to handler functions in the same process, without any network I/O. Allows
+    tests and benchmarks to exercise the whole client, from serialization and compression to error handling, at memory
+    speed.
+
+    Handlers are registered per method and path and receive a `TransportRequest`. They return a `TransportResponse`, or
+    any JSON-serializable object to respond with a 200. Requests without a handler get a 404.
+
+    Example:
+        ```python
+        transport = InMemoryTransport()
+
+        @transport.route("GET", "/scim/v2/Users")
+        def list_users(request):
+            return {"totalResults": 0, "Resources": []}
+
+        client = OmniApiClient(organization_name="acme", api_key="key", transport=transport)
+        ```
+
+    Args:
+        handlers: Initial handlers keyed by (method, path).
+        base_path: Prefix stripped from URL paths before looking up handlers, so handlers are registered with the same
+            paths that are passed to the client.
+    """
+
+    def __init__(
+        self,
+        handlers: Mapping[tuple[str, str], Handler] | None = None,
+        base_path: str = "/api",
+    ) -> None:
+        self.base_path = base_path.rstrip("/")
+        self._handlers: dict[tuple[str, str], Handler] = {}
+        for (method, path), handler in (handlers or {}).items():
+            self.add_handler(method, path, handler)
+
+    def add_handler(self, method: str, path: str, handler: Handler) -> None:
+        """Registers a handler for requests with the given method and path."""
+        self._handlers[method.upper(), "/" + path.strip("/")] = handler
+
+    def route(self, method: str, path: str) -> Callable[[Handler], Handler]:
+        """Decorator version of `add_handler`."""
+
+        def decorator(handler: Handler) -> Handler:
+            self.add_handler(method, path, handler)
+            return handler
+
+        return decorator
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        body: RequestBody | None = None,
+        stream: bool = False,
+        decode_content: bool = True,
+    ) -> TransportResponse:
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path
+        if path.startswith(self.base_path):
+            path = path[len(self.base_path) :]
+        path = "/" + path.strip("/")
+        handler = self._handlers.get((method.upper(), path))
+        if handler is None:
+            return TransportResponse(
+                404,
+                url=url,
+                reason="Not Found",
+                request=_error_request(404, method, url, headers),
+            )
+        request = TransportRequest(
+            method=method,
+            url=url,
+            path=path,
+            params=urllib.parse.parse_qs(parsed.query),
+            headers=CaseInsensitiveDict(headers),
+            body=b"".join(_iter_body(body)),
+        )
+        result = handler(request)
+        if isinstance(result, TransportResponse):
+            if not result.url:
+                result.url = url
+            if result.request is None:
+                result.request = _error_request(
+                    result.status_code, method, url, headers
+                )
+            return result
+        return TransportResponse(
+            200,
+            headers=CaseInsensitiveDict({"Content-Type": "application/json"}),
+            content=json.dumps(result).encode("utf-8"),
+            url=url,
+            reason="OK",
+        )
+
+
+def _error_request(
+    status_code: int, method: str, url: str, headers: Mapping[str, str]
+) -> requests.PreparedRequest | None:
+    """Builds the request attached to `OmniHTTPError`. Skipped for successful responses, which don't need it."""
+    if status_code < 400:
+        return None
+    request = requests.PreparedRequest()
+    request.prepare(method=method, url=url, headers=headers)
+    return request
+
+
+def _stream_urllib3(response: Any, decode_content: bool) -> Iterator[bytes]:
+    try:
+        yield from response.stream(STREAM_CHUNK_SIZE, decode_content=decode_content)
+    except urllib3.exceptions.HTTPError as e:
+        raise requests.ConnectionError(e) from e
+
+
+def _close_urllib3(response: Any) -> None:
+    # A connection with unread body data can't be reused. Fully read responses have released their connection
+    # already, so this only discards connections of responses closed early.
+    response.close()
+    response.release_conn()
+
+
+def _get_idle_connections(connection_pool: Any) -> queue.LifoQueue | None:
+    """Returns the queue of idle connections of a urllib3 connection pool, or None if it doesn't have the layout
+    `_PooledTransport.warmup` relies on."""
+    slots = getattr(connection_pool, "pool", None)
+    if (
+        _WARMUP_SUPPORTED
+        and isinstance(slots, queue.LifoQueue)
+        and isinstance(slots.queue, list)
+        and callable(getattr(connection_pool, "_new_conn", None))
+    ):
+        return slots
+    return None
+
+
+def _move_empty_slots_down(slots: MutableSequence[Any]) -> None:
+    """Reorders the slots of a LIFO connection pool queue so that requests get open connections before empty slots."""
+    items = sorted(slots, key=lambda conn: conn is not None)
+    slots.clear()
+    slots.extend(items)
+
+
+def _iter_body(body: RequestBody | None) -> Iterator[bytes]:
+    if body is None:
+        return
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        yield bytes(body)
+    elif hasattr(body, "read"):
+        yield from iter(functools.partial(body.read, STREAM_CHUNK_SIZE), b"")
+    else:
+        yield from body
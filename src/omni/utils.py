@@ -1,4 +1,20 @@
+from __future__ import annotations
+
+import itertools
 import json
+import os
+import weakref
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Callable, Iterable, Iterator, Protocol, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def compact_json_dump(data: dict | list) -> str:
@@ -8,3 +24,89 @@ def compact_json_dump(data: dict | list) -> str:
         sort_keys=True,
         separators=(",", ":"),
     )
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Lazily splits an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def bounded_process_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    processes: int | None = None,
+    max_pending: int | None = None,
+    initializer: Callable[..., Any] | None = None,
+    initargs: tuple = (),
+) -> Iterator[R]:
+    """Maps `func` over `items` in a process pool and yields the results in input order.
+
+    Unlike `ProcessPoolExecutor.map`, items are only pulled from the iterable as results are consumed, so at most
+    `max_pending` items are in flight at once and arbitrarily large inputs are processed in constant memory. When
+    `processes` is 1 everything runs inline in the current process.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(func, items)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=initializer, initargs=initargs
+    ) as executor:
+        yield from _bounded_map(executor, func, items, max_pending or 2 * processes)
+
+
+def bounded_thread_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    threads: int,
+    max_pending: int | None = None,
+) -> Iterator[R]:
+    """Thread pool version of `bounded_process_map`, for I/O bound work such as API requests."""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        yield from _bounded_map(executor, func, items, max_pending or 2 * threads)
+
+
+def _bounded_map(
+    executor: Executor,
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_pending: int,
+) -> Iterator[R]:
+    pending: deque[Future[R]] = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class ForkSafe(Protocol):
+    def _after_fork_in_child(self) -> None:
+        """Resets state that doesn't survive a fork, e.g. locks held by other threads and background threads."""
+
+
+# Objects to reset in forked child processes. Held weakly, registering doesn't keep them alive.
+_fork_safe_objects: weakref.WeakSet[Any] = weakref.WeakSet()
+
+
+def reset_after_fork(obj: ForkSafe) -> None:
+    """Calls `obj._after_fork_in_child()` in every child process forked after this point. Only the forking thread
+    survives a fork, so locks held by other threads would never be released in the child and background threads
+    would be gone.
+    """
+    _fork_safe_objects.add(obj)
+
+
+def _reset_after_fork_in_child() -> None:
+    for obj in list(_fork_safe_objects):
+        obj._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork_in_child)
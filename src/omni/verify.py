@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hmac
+import os
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from .embed import SIGNED_URL_PARAMS, sign_blob
+from .utils import bounded_process_map, chunked
+
+_SIGNED_URL_PARAM_INDEX = {param: i for i, param in enumerate(SIGNED_URL_PARAMS)}
+
+# Results of `_match_secret` other than the index of the matching secret.
+_UNSIGNED = -1
+_BAD_SIGNATURE = -2
+
+
+@dataclass
+class UrlMismatch:
+    """A URL that failed verification.
+
+    Attributes:
+        line_number: 1-based position of the URL in the verified input.
+        url: The URL as it appeared in the input, without surrounding whitespace.
+        reason: `unsigned` if the URL has no signature param, `bad_signature` if no secret produces its signature.
+    """
+
+    line_number: int
+    url: str
+    reason: str
+
+
+@dataclass
+class UrlVerificationReport:
+    """Results of verifying a stream of signed embed URLs with `verify_urls`.
+
+    Attributes:
+        total: Number of URLs checked. Blank lines are skipped and not counted.
+        valid: Number of URLs signed by one of the secrets.
+        invalid: Number of URLs that are unsigned or not signed by any of the secrets.
+        secret_matches: Number of valid URLs per secret, in the order the secrets were given.
+        mismatches: Details of the first `max_mismatches` invalid URLs.
+        elapsed_seconds: Wall clock time spent verifying.
+    """
+
+    total: int = 0
+    valid: int = 0
+    invalid: int = 0
+    secret_matches: list[int] = field(default_factory=list)
+    mismatches: list[UrlMismatch] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def urls_per_second(self) -> float:
+        """Verification throughput."""
+        return self.total / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def _match_secret(url: str, secrets: tuple[bytes, ...]) -> int:
+    """Returns the index of the secret that signed `url`, `_UNSIGNED` or `_BAD_SIGNATURE`."""
+    base_url, _, query = url.partition("?")
+    # Only the signed params are kept, indexed by their position in the signing blob.
+    blob_items: list[str | None] = [None] * len(SIGNED_URL_PARAMS)
+    signature = None
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        if key == "signature":
+            signature = urllib.parse.unquote_plus(value)
+        elif (index := _SIGNED_URL_PARAM_INDEX.get(key)) is not None:
+            blob_items[index] = urllib.parse.unquote_plus(value)
+    if signature is None:
+        return _UNSIGNED
+
+    blob = "\n".join([base_url, *[i for i in blob_items if i is not None]])
+    # Compared as bytes, compare_digest rejects strings with non-ASCII characters, e.g. those replacing undecodable
+    # bytes in a corrupt log line.
+    signature_bytes = signature.encode("utf-8", errors="surrogatepass")
+    try:
+        for i, secret in enumerate(secrets):
+            if hmac.compare_digest(
+                sign_blob(secret, blob).encode("ascii"), signature_bytes
+            ):
+                return i
+    except UnicodeEncodeError:
+        # The blob contains lone surrogates, which no signed URL does.
+        pass
+    return _BAD_SIGNATURE
+
+
+def _encode_secrets(secrets: str | Iterable[str]) -> tuple[bytes, ...]:
+    if isinstance(secrets, str):
+        secrets = [secrets]
+    encoded = tuple(s.encode("utf-8") for s in secrets)
+    if not encoded:
+        raise ValueError("At least one embed secret is required to verify URLs.")
+    return encoded
+
+
+def verify_url(url: str, secrets: str | Iterable[str]) -> bool:
+    """Checks that a dashboard embedding URL was signed by one of the given embed secrets. This is the inverse of the
+    signing done by `OmniDashboardEmbedder.build_url`.
+
+    Args:
+        url: Signed dashboard embedding URL.
+        secrets: Embed secret or secrets (e.g. current and previously rotated secrets) to check the signature against.
+
+    Returns:
+        : True if one of the secrets produced the URL's signature.
+    """
+    return _match_secret(url.strip(), _encode_secrets(secrets)) >= 0
+
+
+def _verify_chunk(
+    args: tuple[int, list[str], tuple[bytes, ...], int],
+) -> UrlVerificationReport:
+    """Verifies a chunk of input lines. Module level so it can be sent to worker processes."""
+    first_line_number, lines, secrets, max_mismatches = args
+    report = UrlVerificationReport(secret_matches=[0] * len(secrets))
+    for line_number, line in enumerate(lines, start=first_line_number):
+        url = line.strip()
+        if not url:
+            continue
+        report.total += 1
+        match = _match_secret(url, secrets)
+        if match >= 0:
+            report.valid += 1
+            report.secret_matches[match] += 1
+            continue
+        report.invalid += 1
+        if len(report.mismatches) < max_mismatches:
+            reason = "unsigned" if match == _UNSIGNED else "bad_signature"
+            report.mismatches.append(UrlMismatch(line_number, url, reason))
+    return report
+
+
+def _iter_lines(source: str | os.PathLike[str] | Iterable[str]) -> Iterator[str]:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8", errors="replace") as f:
+            yield from f
+    else:
+        yield from source
+
+
+def verify_urls(
+    source: str | os.PathLike[str] | Iterable[str],
+    secrets: str | Iterable[str],
+    processes: int | None = None,
+    chunk_size: int = 10_000,
+    max_mismatches: int = 1_000,
+    progress: Callable[[UrlVerificationReport], None] | None = None,
+) -> UrlVerificationReport:
+    """Verifies a stream of signed dashboard embedding URLs, one per line, across a pool of processes. Input is read
+    lazily so files of any size are verified in constant memory.
+
+    Args:
+        source: Path to a file of URLs or an iterable of URL lines.
+        secrets: Embed secret or secrets (e.g. current and previously rotated secrets) to check signatures against.
+        processes: Number of worker processes. Defaults to the number of CPUs. Pass 1 to verify in this process.
+        chunk_size: Number of lines sent to a worker at a time.
+        max_mismatches: Maximum number of invalid URLs to record details for. All invalid URLs are still counted.
+        progress: Optional callback called with the running report after each chunk is verified.
+
+    Returns:
+        : Counts of valid and invalid URLs, details of mismatches and throughput.
+    """
+    encoded_secrets = _encode_secrets(secrets)
+    report = UrlVerificationReport(secret_matches=[0] * len(encoded_secrets))
+    start = time.perf_counter()
+
+    chunks = (
+        (1 + i * chunk_size, lines, encoded_secrets, max_mismatches)
+        for i, lines in enumerate(chunked(_iter_lines(source), chunk_size))
+    )
+    for chunk_report in bounded_process_map(_verify_chunk, chunks, processes):
+        report.total += chunk_report.total
+        report.valid += chunk_report.valid
+        report.invalid += chunk_report.invalid
+        for i, count in enumerate(chunk_report.secret_matches):
+            report.secret_matches[i] += count
+        remaining = max_mismatches - len(report.mismatches)
+        report.mismatches.extend(chunk_report.mismatches[:remaining])
+        report.elapsed_seconds = time.perf_counter() - start
+        if progress is not None:
+            progress(report)
+
+    report.elapsed_seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Callable, Literal
+
+import requests
+
+from .client import OmniApiClient
+from .utils import bounded_thread_map, reset_after_fork
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    resource TEXT UNIQUE,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    body TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0
+)
+"""
+
+# PUT and DELETE replace the whole resource, so a newer write to the same path supersedes any pending one. The version
+# is bumped so a flush that is sending the superseded write doesn't delete the newer one when it completes.
+_UPSERT = """
+INSERT INTO writes (resource, method, path, body) VALUES (?, ?, ?, ?)
+ON CONFLICT (resource) DO UPDATE SET
+    method = excluded.method,
+    body = excluded.body,
+    version = version + 1,
+    attempts = 0,
+    next_attempt_at = 0
+"""
+
+
+@dataclass(frozen=True)
+class PendingWrite:
+    """A write waiting in a `WriteBehindQueue`.
+
+    Attributes:
+        method: HTTP method of the write.
+        path: Omni REST API path of the write.
+        json_data: Request body.
+        attempts: Number of failed attempts to send the write so far.
+    """
+
+    method: Literal["POST", "PUT", "DELETE"]
+    path: str
+    json_data: dict | None
+    attempts: int
+
+
+class WriteBehindQueue:
+    """Durable write-behind queue for `OmniApiClient` writes. Writes are appended to a local SQLite log and sent by a
+    background thread, taking Omni API latency out of the caller's request path. PUT and DELETE writes to the same
+    path are merged, only the most recent one is sent. POST writes are always sent.
+
+    The log survives restarts: writes that were not sent before the process exited are sent by the next queue opened
+    on the same file. Writes that fail with a connection error, a 429 or a 5xx response are retried with exponential
+    backoff, other failures are dropped and reported to `on_error`.
+
+    Several queues, e.g. one per worker process, may share a log file. A flush leases the writes it sends for
+    `lease_duration` seconds, so each write is sent by one queue only. Writes whose lease expires without being
+    completed, because the process sending them died, are sent again by the next flush. Each process opens its own
+    database connection and, when `flush_interval` is set, runs its own background thread, so a queue created before
+    forking worker processes is safe to use in the workers.
+
+    Args:
+        client: Client used to send the writes.
+        path: Path of the SQLite log file.
+        flush_interval: Seconds between background flushes. Pass 0 to disable the background thread and call `flush`
+            manually.
+        concurrency: Maximum number of writes sent concurrently.
+        max_attempts: Number of attempts before a write is dropped.
+        retry_backoff: Seconds to wait before the first retry, doubling with every further attempt.
+        on_error: Called with the write and the exception when a write is dropped. Failures are logged when None.
+        lease_duration: Seconds a flush reserves the writes it sends for. Should be longer than the client's request
+            timeout, otherwise a slow write may be sent again by another queue.
+    """
+
+    def __init__(
+        self,
+        client: OmniApiClient,
+        path: str | os.PathLike[str],
+        flush_interval: float = 1.0,
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        retry_backoff: float = 1.0,
+        on_error: Callable[[PendingWrite, Exception], None] | None = None,
+        lease_duration: float = 300.0,
+    ) -> None:
+        self.client = client
+        self.path = path
+        self.flush_interval = flush_interval
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.on_error = on_error
+        self.lease_duration = lease_duration
+        self._db_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._db_pid: int | None = None
+        # Create the schema right away so configuration errors surface on creation.
+        self._get_db()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._start_flusher()
+        reset_after_fork(self)
+
+    def __enter__(self) -> WriteBehindQueue:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """Number of writes waiting to be sent."""
+        with self._db_lock:
+            (count,) = self._get_db().execute("SELECT COUNT(*) FROM writes").fetchone()
+        return int(count)
+
+    def post(self, path: str, json_data: dict | None = None) -> None:
+        """Queues a POST request.
+
+        Args:
+            path: The path in the Omni REST API to make a POST request.
+            json_data: Request body.
+        """
+        self._append("POST", path, json_data)
+
+    def put(self, path: str, json_data: dict | None = None) -> None:
+        """Queues a PUT request, replacing any pending PUT or DELETE to the same path.
+
+        Args:
+            path: The path in the Omni REST API to make a PUT request.
+            json_data: Request body.
+        """
+        self._append("PUT", path, json_data)
+
+    def delete(self, path: str) -> None:
+        """Queues a DELETE request, replacing any pending PUT to the same path.
+
+        Args:
+            path: The path in the Omni REST API to make a DELETE request.
+        """
+        self._append("DELETE", path, None)
+
+    def flush(self) -> int:
+        """Sends all writes that are due, i.e. not waiting for a retry.
+
+        Returns:
+            : Number of writes sent successfully.
+        """
+        sent = 0
+        with self._flush_lock:
+            while rows := self._due(limit=self.concurrency * 16):
+                for row, error in zip(
+                    rows,
+                    bounded_thread_map(self._send, rows, threads=self.concurrency),
+                ):
+                    if error is None:
+                        sent += 1
+                        self._complete(row)
+                    else:
+                        self._fail(row, error)
+        return sent
+
+    def close(self, flush: bool = True) -> None:
+        """Stops the background thread and closes the log. Writes that are still pending are kept in the log.
+
+        Args:
+            flush: Send the writes that are due before closing.
+        """
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        if flush:
+            self.flush()
+        with self._db_lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _get_db(self) -> sqlite3.Connection:
+        """Returns this process's connection. Must be called with the lock held, except from `__init__`."""
+        if self._db is None or self._db_pid != os.getpid():
+            # A connection inherited from a parent process must not be used or closed, SQLite connections can't be
+            # shared across a fork.
+            db = sqlite3.connect(
+                self.path, timeout=10, check_same_thread=False, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            # Commits in WAL mode with synchronous=NORMAL survive an application crash, only a power loss can drop
+            # the most recent writes.
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(_SCHEMA)
+            self._db = db
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _start_flusher(self) -> None:
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._run, args=(self._stop, self.flush_interval), daemon=True
+            )
+            self._flusher.start()
+
+    def _after_fork_in_child(self) -> None:
+        # Locks may have been held by other threads at the time of the fork, in which case they would never be
+        # released in the child. Only the forking thread survives, so the background flusher is started again.
+        self._db_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._db = None
+        self._flusher = None
+        if not self._stop.is_set():
+            self._stop = threading.Event()
+            self._start_flusher()
+
+    def _append(
+        self,
+        method: Literal["POST", "PUT", "DELETE"],
+        path: str,
+        json_data: dict | None,
+    ) -> None:
+        resource = None if method == "POST" else path
+        body = None if json_data is None else json.dumps(json_data, allow_nan=False)
+        with self._db_lock:
+            self._get_db().execute(_UPSERT, (resource, method, path, body))
+
+    def _due(self, limit: int) -> list[tuple]:
+        """Leases up to `limit` writes that are due. Leased writes aren't due for other queues on the same file until
+        they are completed, rescheduled for a retry or the lease expires."""
+        now = time.time()
+        with self._db_lock:
+            db = self._get_db()
+            # Takes the write lock up front, so no other queue can select the same rows before they are leased.
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = db.execute(
+                    "SELECT id, version, method, path, body, attempts FROM writes "
+                    "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                db.executemany(
+                    "UPDATE writes SET next_attempt_at = ? WHERE id = ?",
+                    [(now + self.lease_duration, row[0]) for row in rows],
+                )
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        return rows
+
+    def _send(self, row: tuple) -> Exception | None:
+        _, _, method, path, body, _ = row
+        json_data = None if body is None else json.loads(body)
+        try:
+            # Any 2xx response is a success. Response bodies are not decoded, they may be empty, e.g. for a 204.
+            if method == "DELETE":
+                self.client.delete_raw(path)
+            elif method == "PUT":
+                self.client.put_raw(path, json_data=json_data)
+            else:
+                self.client.post_raw(path, json_data=json_data)
+        except Exception as e:
+            return e
+        return None
+
+    def _complete(self, row: tuple) -> None:
+        write_id, version = row[:2]
+        with self._db_lock:
+            self._get_db().execute(
+                "DELETE FROM writes WHERE id = ? AND version = ?", (write_id, version)
+            )
+
+    def _fail(self, row: tuple, error: Exception) -> None:
+        write_id, version, method, path, body, attempts = row
+        attempts += 1
+        if _is_retryable(error) and attempts < self.max_attempts:
+            next_attempt_at = time.time() + self.retry_backoff * 2 ** (attempts - 1)
+            with self._db_lock:
+                self._get_db().execute(
+                    "UPDATE writes SET attempts = ?, next_attempt_at = ? WHERE id = ? AND version = ?",
+                    (attempts, next_attempt_at, write_id, version),
+                )
+            return
+        self._complete(row)
+        write = PendingWrite(
+            method, path, None if body is None else json.loads(body), attempts
+        )
+        if self.on_error is not None:
+            self.on_error(write, error)
+        else:
+            logger.error(
+                "Dropping %s %s after %d attempts.",
+                method,
+                path,
+                attempts,
+                exc_info=error,
+            )
+
+    def _run(self, stop: threading.Event, flush_interval: float) -> None:
+        while not stop.wait(flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush the Omni write-behind queue.")
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, requests.HTTPError):
+        status_code = error.response.status_code if error.response is not None else 0
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, requests.RequestException)
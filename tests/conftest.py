@@ -0,0 +1,82 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Responds with the request's method, path, body and the client's port, which identifies the connection. Paths
+    containing "missing" respond with a 404 and paths containing "unavailable" with a 503. Responses to paths
+    containing "gzipped" are gzip-compressed.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while size := int(self.rfile.readline().strip(), 16):
+                body += self.rfile.read(size)
+                self.rfile.readline()
+            self.rfile.readline()
+            return body
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _respond(self) -> None:
+        body = self._read_body()
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        content = json.dumps(
+            {
+                "method": self.command,
+                "path": self.path,
+                "body": body.decode("utf-8"),
+                "client_port": self.client_address[1],
+                "headers": {
+                    k.lower(): v
+                    for k, v in self.headers.items()
+                    if k.lower()
+                    in (
+                        "content-type",
+                        "content-encoding",
+                        "content-length",
+                        "transfer-encoding",
+                    )
+                },
+            }
+        ).encode()
+        if "missing" in self.path:
+            status = 404
+        elif "unavailable" in self.path:
+            status = 503
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzipped" in self.path:
+            content = gzip.compress(content)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api"
+    server.shutdown()
+    server.server_close()
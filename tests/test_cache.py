@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from omni.cache import SQLiteCache, TTLCache
+
+
+class TestTTLCache:
+    def test_expiry(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        now = 1000.0
+        monkeypatch.setattr(time, "time", lambda: now)
+        cache = TTLCache()
+        cache.set("a", {"b": 1}, ttl=10)
+        assert cache.get("a") == {"b": 1}
+        now += 10
+        assert cache.get("a") is None
+
+    def test_delete_and_clear(self) -> None:
+        cache = TTLCache()
+        cache.set("a", 1, ttl=10)
+        cache.set("b", 2, ttl=10)
+        cache.delete("a")
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        cache.clear()
+        assert cache.get("b") is None
+
+    def test_get_or_load(self) -> None:
+        cache = TTLCache()
+        calls = []
+
+        def loader() -> int:
+            calls.append(1)
+            return len(calls)
+
+        assert cache.get_or_load("a", loader, ttl=10) == 1
+        assert cache.get_or_load("a", loader, ttl=10) == 1
+        assert len(calls) == 1
+
+    def test_persistence(self, tmp_path: Path) -> None:
+        path = tmp_path / "cache.json"
+        cache = TTLCache(path)
+        cache.set("a", {"b": [1, 2]}, ttl=10)
+        cache.set("expired", 1, ttl=0)
+        assert path.exists()
+
+        reloaded = TTLCache(path)
+        assert reloaded.get("a") == {"b": [1, 2]}
+        assert reloaded.get("expired") is None
+
+        path.write_text("not json")
+        assert TTLCache(path).get("a") is None
+
+    def test_max_entries(self, tmp_path: Path) -> None:
+        path = tmp_path / "cache.json"
+        cache = TTLCache(path, max_entries=3, prune_interval=1)
+        cache.set("expired", 0, ttl=-1)
+        for i in range(5):
+            cache.set(str(i), i, ttl=10 + i)
+        assert len(cache) == 3
+        # The entries closest to expiring are evicted first.
+        assert [cache.get(str(i)) for i in range(5)] == [None, None, 2, 3, 4]
+        assert sorted(json.loads(path.read_text())) == ["2", "3", "4"]
+
+    def test_expired_entries_are_removed(self) -> None:
+        cache = TTLCache(prune_interval=10)
+        for i in range(10):
+            cache.set(str(i), i, ttl=-1)
+        assert len(cache) == 0
+
+    def test_background_refresh(self) -> None:
+        cache = TTLCache(refresh_ahead=0.1)
+        refreshed = threading.Event()
+        calls = []
+
+        def loader() -> int:
+            calls.append(1)
+            if len(calls) > 1:
+                refreshed.set()
+            return len(calls)
+
+        assert cache.get_or_load("a", loader, ttl=0.5, background_refresh=True) == 1
+        # Reads mark the entry as in use so it keeps being refreshed.
+        assert cache.get("a") == 1
+        assert refreshed.wait(timeout=5)
+        deadline = time.monotonic() + 5
+        while cache.get("a") == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get("a") == 2
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+    def test_fork(self) -> None:
+        cache = TTLCache()
+        cache.get_or_load("a", lambda: 1, ttl=60, background_refresh=True)
+        # Forked while another thread holds the lock, e.g. while persisting.
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock() -> None:
+            with cache._lock:
+                locked.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child process
+            try:
+                # The parent's refresh timer doesn't exist in the child.
+                result: dict = {"refreshing": dict(cache._refreshing)}
+                result["lock_released"] = cache._lock.acquire(timeout=1)
+                cache._lock.release()
+                cache.set("a", 1, ttl=-1)
+                cache.get_or_load("a", lambda: 2, ttl=60, background_refresh=True)
+                result["rescheduled"] = cache._refreshing
+                os.write(write_fd, json.dumps(result).encode())
+            finally:
+                os._exit(0)
+        release.set()
+        thread.join()
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd) as f:
+            assert json.loads(f.read()) == {
+                "refreshing": {},
+                "lock_released": True,
+                "rescheduled": {"a": False},
+            }
+
+
+class TestSQLiteCache:
+    def test_get_set(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        now = 1000.0
+        monkeypatch.setattr(time, "time", lambda: now)
+        cache = SQLiteCache(tmp_path / "cache.db")
+        cache.set("a", {"b": [1, 2]}, ttl=10)
+        assert cache.get("a") == {"b": [1, 2]}
+        now += 10
+        assert cache.get("a") is None
+        cache.set("b", 1, ttl=10)
+        cache.delete("b")
+        assert cache.get("b") is None
+        cache.set("c", 1, ttl=10)
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_shared_between_instances(self, tmp_path: Path) -> None:
+        first = SQLiteCache(tmp_path / "cache.db")
+        second = SQLiteCache(tmp_path / "cache.db")
+        first.set("a", 1, ttl=10)
+        assert second.get("a") == 1
+        assert second.get_or_load("a", lambda: 2, ttl=10) == 1
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+    def test_shared_between_processes(self, tmp_path: Path) -> None:
+        cache = SQLiteCache(tmp_path / "cache.db")
+        cache.set("parent", 1, ttl=10)
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child process
+            try:
+                cache.set("child", cache.get("parent") + 1, ttl=10)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        assert cache.get("child") == 2
+
+    def test_max_entries(self, tmp_path: Path) -> None:
+        cache = SQLiteCache(tmp_path / "cache.db", max_entries=3, prune_interval=1)
+        cache.set("expired", 0, ttl=-1)
+        for i in range(5):
+            cache.set(str(i), i, ttl=10 + i)
+        assert len(cache) == 3
+        # The entries closest to expiring are evicted first.
+        assert [cache.get(str(i)) for i in range(5)] == [None, None, 2, 3, 4]
+
+    def test_refresh_skipped_when_refreshed_elsewhere(self, tmp_path: Path) -> None:
+        cache = SQLiteCache(tmp_path / "cache.db", refresh_ahead=0.5)
+        other = SQLiteCache(tmp_path / "cache.db")
+        calls = []
+        cache.get_or_load(
+            "a", lambda: calls.append(1) or "stale", ttl=10, background_refresh=True
+        )
+        cache.get("a")
+        # Another process refreshed the entry in the meantime.
+        other.set("a", "fresh", ttl=10)
+        cache._refresh("a", lambda: calls.append(1), 10)
+        assert calls == [1]
+        assert cache.get("a") == "fresh"
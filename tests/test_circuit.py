@@ -0,0 +1,192 @@
+import threading
+import time
+from typing import Iterator
+
+import pytest
+import requests
+
+from omni import OmniApiClient
+from omni.circuit import CircuitBreaker, CircuitState, OmniCircuitOpenError
+from omni.transport import InMemoryTransport, TransportResponse
+
+
+@pytest.fixture
+def transitions() -> list[tuple[str, CircuitState, CircuitState]]:
+    return []
+
+
+@pytest.fixture
+def breaker(
+    transitions: list[tuple[str, CircuitState, CircuitState]],
+) -> CircuitBreaker:
+    return CircuitBreaker(
+        window_size=4,
+        minimum_calls=4,
+        open_duration=0.1,
+        on_state_change=lambda *args: transitions.append(args),
+    )
+
+
+@pytest.fixture
+def client(server_url: str, breaker: CircuitBreaker) -> Iterator[OmniApiClient]:
+    client = OmniApiClient(
+        organization_name="acme", api_key="key", circuit_breaker=breaker
+    )
+    client.base_url = server_url
+    yield client
+    client.close()
+
+
+def fail(client: OmniApiClient, times: int) -> None:
+    for _ in range(times):
+        with pytest.raises(requests.HTTPError):
+            client.get("/v1/items/1", params={"status": "unavailable"})
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_rate(
+        self,
+        client: OmniApiClient,
+        breaker: CircuitBreaker,
+        transitions: list[tuple[str, CircuitState, CircuitState]],
+    ) -> None:
+        client.get("/v1/items/1")
+        client.get("/v1/items/2")
+        fail(client, 2)
+        circuit = breaker.get_circuit("GET", f"{client.base_url}/v1/items/3")
+        assert circuit.state == CircuitState.open
+        assert transitions == [(circuit.key, CircuitState.closed, CircuitState.open)]
+        with pytest.raises(OmniCircuitOpenError):
+            client.get("/v1/items/3")
+        # Other endpoints are unaffected.
+        assert client.post("/v1/items/3")["method"] == "POST"
+
+    def test_client_errors_are_not_failures(
+        self, client: OmniApiClient, breaker: CircuitBreaker
+    ) -> None:
+        for _ in range(4):
+            with pytest.raises(requests.HTTPError):
+                client.get("/v1/missing")
+        circuit = breaker.get_circuit("GET", f"{client.base_url}/v1/missing")
+        assert circuit.state == CircuitState.closed
+
+    def test_slow_calls_are_failures(self, client: OmniApiClient) -> None:
+        assert client.circuit_breaker is not None
+        client.circuit_breaker.slow_call_duration = 0
+        for _ in range(4):
+            client.post("/v1/items")
+        with pytest.raises(OmniCircuitOpenError):
+            client.post("/v1/items")
+
+    def test_serves_stale_response_while_open(self, client: OmniApiClient) -> None:
+        first = client.get("/v1/items/1")
+        fail(client, 3)
+        assert client.get("/v1/items/1") == first
+        # Nothing to serve for a request that never succeeded.
+        with pytest.raises(OmniCircuitOpenError):
+            client.get("/v1/items/2")
+
+    def test_stale_responses_are_copies(self, client: OmniApiClient) -> None:
+        client.get("/v1/items/1")["injected"] = True
+        fail(client, 3)
+        stale = client.get("/v1/items/1")
+        assert "injected" not in stale
+        stale["injected"] = True
+        assert "injected" not in client.get("/v1/items/1")
+
+    def test_stale_responses_are_per_api_key(
+        self, client: OmniApiClient, breaker: CircuitBreaker, server_url: str
+    ) -> None:
+        client.get("/v1/items/1")
+        fail(client, 3)
+        other = OmniApiClient(
+            organization_name="acme", api_key="other", circuit_breaker=breaker
+        )
+        other.base_url = server_url
+        with pytest.raises(OmniCircuitOpenError):
+            other.get("/v1/items/1")
+
+    def test_half_open_probe(
+        self,
+        client: OmniApiClient,
+        breaker: CircuitBreaker,
+        transitions: list[tuple[str, CircuitState, CircuitState]],
+    ) -> None:
+        fail(client, 4)
+        circuit = breaker.get_circuit("GET", f"{client.base_url}/v1/items/1")
+        time.sleep(0.1)
+        assert circuit.state == CircuitState.half_open
+        # A failed probe opens the circuit again.
+        fail(client, 1)
+        assert circuit.state == CircuitState.open
+        time.sleep(0.1)
+        assert circuit.allow_request()
+        # Only one probe at a time.
+        assert not circuit.allow_request()
+        circuit.record(True, 0.0)
+        assert circuit.state == CircuitState.closed
+        assert [state for _, _, state in transitions] == [
+            CircuitState.open,
+            CircuitState.half_open,
+            CircuitState.open,
+            CircuitState.half_open,
+            CircuitState.closed,
+        ]
+
+    def test_unexpected_errors_release_probe(self, breaker: CircuitBreaker) -> None:
+        statuses = [503] * 4 + [200]
+        transport = InMemoryTransport()
+        transport.add_handler(
+            "POST", "/v1/items", lambda request: TransportResponse(statuses.pop(0))
+        )
+        client = OmniApiClient(
+            organization_name="acme",
+            api_key="key",
+            circuit_breaker=breaker,
+            transport=transport,
+        )
+
+        def body() -> Iterator[bytes]:
+            raise OSError("Disk read failed")
+            yield b""
+
+        for _ in range(4):
+            with pytest.raises(requests.HTTPError):
+                client.post("/v1/items")
+        time.sleep(0.1)
+        with pytest.raises(OSError):
+            client.post("/v1/items", data=body())
+        circuit = breaker.get_circuit("POST", f"{client.base_url}/v1/items")
+        assert circuit.state == CircuitState.open
+        time.sleep(0.1)
+        assert client.post_raw("/v1/items").status_code == 200
+        assert circuit.state == CircuitState.closed
+
+    def test_per_host(self, breaker: CircuitBreaker) -> None:
+        breaker.per_endpoint = False
+        assert breaker.get_circuit(
+            "GET", "https://acme.omniapp.co/api/v1/a"
+        ) is breaker.get_circuit("POST", "https://acme.omniapp.co/api/v1/b")
+
+    def test_stale_responses_are_bounded(self, breaker: CircuitBreaker) -> None:
+        breaker.stale_responses = 2
+        for i in range(3):
+            breaker.store_stale(str(i), f'{{"i": {i}}}')
+        assert breaker.get_stale("0") is None
+        assert breaker.get_stale("2") == '{"i": 2}'
+
+    def test_hook_can_read_state(self) -> None:
+        states: list[CircuitState] = []
+
+        def on_state_change(
+            key: str, previous: CircuitState, state: CircuitState
+        ) -> None:
+            states.append(breaker.circuits[key].state)
+
+        breaker = CircuitBreaker(minimum_calls=1, on_state_change=on_state_change)
+        circuit = breaker.get_circuit("GET", "https://acme.omniapp.co/api/v1/items")
+        thread = threading.Thread(target=circuit.record, args=(False, 0.0), daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert states == [CircuitState.open]
@@ -0,0 +1,166 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from omni import OmniApiClient, verify_url
+from omni.cli import main
+
+
+@pytest.fixture(autouse=True)
+def omni_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OMNI_ORGANIZATION_NAME", "acme")
+    monkeypatch.setenv("OMNI_EMBED_SECRET", "super_secret")
+    monkeypatch.setenv("OMNI_API_KEY", "key")
+
+
+@pytest.fixture
+def users_file(tmp_path: Path) -> Path:
+    path = tmp_path / "users.jsonl"
+    records = [
+        {
+            "content_path": "/dashboards/1",
+            "external_id": str(i),
+            "name": f"User {i}",
+            "mode": "APPLICATION",
+            "theme": "dawn",
+            "user_attributes": {"id": i},
+        }
+        for i in range(25)
+    ]
+    lines = [json.dumps(r) for r in records]
+    lines.insert(3, "")
+    lines.insert(5, '{"content_path": "/dashboards/1", "external_id": "x"}')
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+class TestEmbedSign:
+    @pytest.mark.parametrize("processes", ["1", "2"])
+    def test_jsonl(
+        self,
+        users_file: Path,
+        tmp_path: Path,
+        processes: str,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        output = tmp_path / "urls.jsonl"
+        exit_code = main(
+            [
+                "embed",
+                "sign",
+                "--input",
+                str(users_file),
+                "--output",
+                str(output),
+                "--processes",
+                processes,
+                "--chunk-size",
+                "4",
+            ]
+        )
+        assert exit_code == 1
+        assert "line 6: TypeError" in capsys.readouterr().err
+
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [r["external_id"] for r in records] == [str(i) for i in range(25)]
+        assert records[3]["line"] == 5
+        for record in records:
+            assert "mode=APPLICATION" in record["url"]
+            assert verify_url(record["url"], "super_secret")
+
+    def test_csv(self, tmp_path: Path) -> None:
+        input_file = tmp_path / "users.jsonl"
+        input_file.write_text(
+            json.dumps({"content_path": "/d/1", "external_id": "1", "name": "A"})
+        )
+        output = tmp_path / "urls.csv"
+        exit_code = main(
+            [
+                "embed",
+                "sign",
+                "--input",
+                str(input_file),
+                "--output",
+                str(output),
+                "--format",
+                "csv",
+                "--processes",
+                "1",
+                "--quiet",
+            ]
+        )
+        assert exit_code == 0
+        with open(output, newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["line", "external_id", "url"]
+        assert rows[1][:2] == ["1", "1"]
+        assert verify_url(rows[1][2], "super_secret")
+
+    def test_missing_config(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        users_file: Path,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        monkeypatch.delenv("OMNI_EMBED_SECRET")
+        assert main(["embed", "sign", "--input", str(users_file)]) == 2
+        assert "OMNI_EMBED_SECRET" in capsys.readouterr().err
+
+
+class TestApiBulk:
+    def test_bulk(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        server_url: str,
+        tmp_path: Path,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        def local_client(**kwargs: Any) -> OmniApiClient:
+            client = OmniApiClient(**kwargs)
+            client.base_url = server_url
+            return client
+
+        monkeypatch.setattr("omni.cli.OmniApiClient", local_client)
+        operations = [
+            {"method": "GET", "path": "/v1/documents", "params": {"page": 1}},
+            {"method": "POST", "path": "/scim/v2/Users", "json": {"userName": "a"}},
+            {"method": "PUT", "path": "/scim/v2/Users/1", "json": {"active": True}},
+            {"method": "DELETE", "path": "/scim/v2/Users/1"},
+            {"method": "GET", "path": "/missing"},
+            {"method": "PATCH", "path": "/scim/v2/Users/1"},
+        ]
+        input_file = tmp_path / "ops.jsonl"
+        input_file.write_text("\n".join(json.dumps(o) for o in operations))
+        output = tmp_path / "results.jsonl"
+
+        exit_code = main(
+            [
+                "api",
+                "bulk",
+                "--input",
+                str(input_file),
+                "--output",
+                str(output),
+                "--concurrency",
+                "3",
+            ]
+        )
+        assert exit_code == 1
+        err = capsys.readouterr().err
+        assert "line 5: 404" in err
+        assert "line 6: ValueError" in err
+
+        results = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [r["status"] for r in results] == ["ok"] * 4 + ["error"] * 2
+        assert results[0]["response"]["path"] == "/api/v1/documents?page=1"
+        assert [r["response"]["method"] for r in results[:4]] == [
+            "GET",
+            "POST",
+            "PUT",
+            "DELETE",
+        ]
+        assert json.loads(results[1]["response"]["body"]) == {"userName": "a"}
+        assert results[4]["status_code"] == 404
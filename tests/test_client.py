@@ -0,0 +1,367 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+import requests
+
+import omni.transport
+from omni import OmniApiClient
+from omni.cache import SQLiteCache, TTLCache
+from omni.transport import (
+    InMemoryTransport,
+    OmniHTTPError,
+    RequestsTransport,
+    Urllib3Transport,
+)
+
+
+@pytest.fixture(params=[RequestsTransport, Urllib3Transport])
+def client(server_url: str, request: pytest.FixtureRequest) -> Iterator[OmniApiClient]:
+    client = OmniApiClient(
+        organization_name="acme",
+        api_key="key",
+        transport=request.param(max_connections=8),
+    )
+    client.base_url = server_url
+    yield client
+    client.close()
+
+
+class TestConnectionPooling:
+    def test_connections_are_reused(self, client: OmniApiClient) -> None:
+        first = client.get("/v1/documents")
+        second = client.get("/v1/documents")
+        assert first["client_port"] == second["client_port"]
+
+    def test_concurrent_requests(self, client: OmniApiClient) -> None:
+        def request(i: int) -> tuple[int, dict]:
+            if i % 2:
+                return i, client.post(f"/v1/items/{i}", json_data={"i": i})
+            return i, client.get(f"/v1/items/{i}")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(request, range(200)))
+
+        for i, response in results:
+            assert response["path"] == f"/api/v1/items/{i}"
+            assert response["method"] == ("POST" if i % 2 else "GET")
+            if i % 2:
+                assert json.loads(response["body"]) == {"i": i}
+        # Every request went through one pool, so connections were reused across threads.
+        assert len({r["client_port"] for _, r in results}) <= 8
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+    def test_fork(self, client: OmniApiClient) -> None:
+        parent_port = client.get("/v1/documents")["client_port"]
+        parent_session = client.transport._pool
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child process
+            try:
+                child_port = client.get("/v1/documents")["client_port"]
+                result = {
+                    "new_session": client.transport._pool is not parent_session,
+                    "new_connection": child_port != parent_port,
+                }
+                os.write(write_fd, json.dumps(result).encode())
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd) as f:
+            assert json.loads(f.read()) == {"new_session": True, "new_connection": True}
+        # The parent's pooled connection is unaffected by the child.
+        assert client.transport._pool is parent_session
+        assert client.get("/v1/documents")["client_port"] == parent_port
+
+
+class TestRequestBodies:
+    def test_json(self, client: OmniApiClient) -> None:
+        response = client.post("/v1/items", json_data={"a": 1})
+        assert json.loads(response["body"]) == {"a": 1}
+        assert response["headers"]["content-type"] == "application/json"
+        assert "content-encoding" not in response["headers"]
+
+    def test_compressed_json(self, client: OmniApiClient) -> None:
+        payload = {"rows": [{"id": i} for i in range(1000)]}
+        response = client.put("/v1/items", json_data=payload, compress=True)
+        assert json.loads(response["body"]) == payload
+        assert response["headers"]["content-encoding"] == "gzip"
+        assert response["headers"]["content-type"] == "application/json"
+        assert int(response["headers"]["content-length"]) < len(json.dumps(payload))
+
+    def test_bytes(self, client: OmniApiClient) -> None:
+        response = client.post(
+            "/v1/items", data=b"name: model", content_type="text/yaml"
+        )
+        assert response["body"] == "name: model"
+        assert response["headers"]["content-type"] == "text/yaml"
+        assert response["headers"]["content-length"] == "11"
+
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_generator(self, client: OmniApiClient, compress: bool) -> None:
+        chunks = (f'"{i}",'.encode() for i in range(10000))
+        response = client.post("/v1/items", data=chunks, compress=compress)
+        assert response["headers"]["transfer-encoding"] == "chunked"
+        assert response["body"] == "".join(f'"{i}",' for i in range(10000))
+        assert ("content-encoding" in response["headers"]) is compress
+
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_file(self, client: OmniApiClient, tmp_path: Path, compress: bool) -> None:
+        path = tmp_path / "model.json"
+        path.write_text(json.dumps({"views": ["x" * 100] * 2000}))
+        with open(path, "rb") as f:
+            response = client.put("/v1/items", data=f, compress=compress)
+        assert response["body"] == path.read_text()
+
+    def test_json_and_data(self, client: OmniApiClient) -> None:
+        with pytest.raises(ValueError):
+            client.post("/v1/items", json_data={"a": 1}, data=b"{}")
+
+
+class TestErrors:
+    def test_http_error(self, client: OmniApiClient) -> None:
+        with pytest.raises(requests.HTTPError) as exc_info:
+            client.get("/v1/missing")
+        assert isinstance(exc_info.value, OmniHTTPError)
+        response = exc_info.value.response
+        assert isinstance(response, requests.Response)
+        assert response.status_code == 404
+        assert not response.ok
+        assert json.loads(response.text)["path"] == "/api/v1/missing"
+        assert response.json()["method"] == "GET"
+        assert response.request.method == "GET"
+        assert response.request.url == f"{client.base_url}/v1/missing"
+
+    def test_invalid_json(self, client: OmniApiClient) -> None:
+        response = client.get_raw("/v1/documents")
+        response.content = b"<html>"
+        with pytest.raises(requests.JSONDecodeError):
+            response.json()
+
+    def test_connection_error(self, client: OmniApiClient) -> None:
+        client.base_url = "http://127.0.0.1:1/api"
+        with pytest.raises(requests.ConnectionError):
+            client.get("/v1/documents")
+
+    def test_params(self, client: OmniApiClient) -> None:
+        response = client.get(
+            "/v1/documents", params={"a": "x y", "b": [1, 2], "c": None}
+        )
+        assert response["path"] == "/api/v1/documents?a=x+y&b=1&b=2"
+
+
+class TestRawResponses:
+    def test_get_raw(self, client: OmniApiClient) -> None:
+        response = client.get_raw("/v1/documents", params={"a": 1})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert json.loads(response.content)["path"] == "/api/v1/documents?a=1"
+
+    def test_stream(self, client: OmniApiClient) -> None:
+        response = client.post_raw("/v1/items", data=b"x" * 200_000, stream=True)
+        assert response.content == b""
+        body = b"".join(response.iter_content())
+        assert json.loads(body)["body"] == "x" * 200_000
+        # The connection has been released back to the pool.
+        assert client.get("/v1/documents")["path"] == "/api/v1/documents"
+
+    def test_close_unread_stream(self, client: OmniApiClient) -> None:
+        for _ in range(10):
+            client.put_raw("/v1/items/1", json_data={"a": 1}, stream=True).close()
+        assert client.get("/v1/documents")["path"] == "/api/v1/documents"
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_errors(self, client: OmniApiClient, stream: bool) -> None:
+        with pytest.raises(OmniHTTPError) as exc_info:
+            client.get_raw("/v1/missing", stream=stream)
+        assert exc_info.value.response.status_code == 404
+        response = client.get_raw("/v1/missing", stream=stream, raise_for_status=False)
+        assert response.status_code == 404
+        assert json.loads(response.read())["path"] == "/api/v1/missing"
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_compressed_body_is_passed_through(
+        self, client: OmniApiClient, stream: bool
+    ) -> None:
+        response = client.get_raw("/v1/gzipped", stream=stream)
+        content = response.read()
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert int(response.headers["Content-Length"]) == len(content)
+        assert json.loads(gzip.decompress(content))["path"] == "/api/v1/gzipped"
+        response = client.get_raw("/v1/gzipped", stream=stream, decode_content=True)
+        assert json.loads(response.read())["path"] == "/api/v1/gzipped"
+        assert client.get("/v1/gzipped")["path"] == "/api/v1/gzipped"
+
+    def test_compressed_error_body(self, client: OmniApiClient) -> None:
+        with pytest.raises(OmniHTTPError) as exc_info:
+            client.get_raw("/v1/gzipped/missing")
+        assert exc_info.value.response.json()["path"] == "/api/v1/gzipped/missing"
+
+
+class TestWarmup:
+    def pooled_ports(self, client: OmniApiClient) -> set[int]:
+        transport = client.transport
+        connection_pool = transport._get_connection_pool(  # type: ignore[attr-defined]
+            transport._get_pool(), client.base_url  # type: ignore[attr-defined]
+        )
+        return {
+            conn.sock.getsockname()[1]
+            # Copied first, as the keepalive thread may be taking connections out of the queue.
+            for conn in list(connection_pool.pool.queue)
+            if conn is not None and conn.sock is not None
+        }
+
+    def test_warmup(self, client: OmniApiClient) -> None:
+        assert client.warmup(connections=3) == 3
+        ports = self.pooled_ports(client)
+        assert len(ports) == 3
+        # Already warm.
+        assert client.warmup(connections=3) == 0
+        assert client.get("/v1/documents")["client_port"] in ports
+
+    @pytest.mark.parametrize("transport_class", [RequestsTransport, Urllib3Transport])
+    def test_defaults_to_transport_max_connections(
+        self, server_url: str, transport_class: type[RequestsTransport]
+    ) -> None:
+        client = OmniApiClient(
+            organization_name="acme",
+            api_key="key",
+            transport=transport_class(max_connections=16),
+        )
+        client.base_url = server_url
+        try:
+            assert client.warmup() == 16
+        finally:
+            client.close()
+
+    def test_unsupported_urllib3(
+        self,
+        client: OmniApiClient,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        monkeypatch.setattr(omni.transport, "_WARMUP_SUPPORTED", False)
+        assert client.warmup(connections=3) == 0
+        assert "Skipping warmup" in caplog.text
+        assert client.get("/v1/documents")["path"] == "/api/v1/documents"
+
+    def test_awarmup(self, client: OmniApiClient) -> None:
+        assert asyncio.run(client.awarmup(connections=2)) == 2
+
+    def test_keepalive_replaces_closed_connections(self, client: OmniApiClient) -> None:
+        client.warmup(connections=2, keepalive=0.01)
+        connection_pool = client.transport._get_connection_pool(  # type: ignore[attr-defined]
+            client.transport._get_pool(), client.base_url  # type: ignore[attr-defined]
+        )
+        for conn in connection_pool.pool.queue:
+            if conn is not None:
+                conn.close()
+        deadline = time.monotonic() + 5
+        while len(ports := self.pooled_ports(client)) < 2:
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        assert len(ports) == 2
+        client.close()
+        assert client._keepalive_stop is None
+
+    def test_warmup_leaves_connections_in_use_alone(
+        self, client: OmniApiClient, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        client.warmup()
+        stop = threading.Event()
+
+        def rewarm() -> None:
+            while not stop.is_set():
+                client.transport.warmup(client.base_url, client.max_connections)
+
+        thread = threading.Thread(target=rewarm)
+        thread.start()
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                ports = set(
+                    executor.map(
+                        lambda _: client.get("/v1/documents")["client_port"], range(200)
+                    )
+                )
+        finally:
+            stop.set()
+            thread.join()
+        # Requests never found the pool empty, so no extra connections were opened and discarded.
+        assert "Connection pool is full" not in caplog.text
+        assert len(ports) <= client.max_connections
+
+    def test_no_pool(self) -> None:
+        client = OmniApiClient(
+            organization_name="acme", api_key="key", transport=InMemoryTransport()
+        )
+        assert client.warmup() == 0
+
+
+class TestResponseCache:
+    def test_get_responses_are_cached(self, tmp_path: Path) -> None:
+        transport = InMemoryTransport()
+        calls = []
+        transport.add_handler(
+            "GET", "/v1/documents", lambda request: calls.append(1) or {"n": len(calls)}
+        )
+        cache = SQLiteCache(tmp_path / "cache.db")
+        client = OmniApiClient(
+            organization_name="acme", api_key="key", transport=transport, cache=cache
+        )
+        assert client.get("/v1/documents") == {"n": 1}
+        assert client.get("/v1/documents") == {"n": 1}
+        assert client.get("/v1/documents", params={"page": 2}) == {"n": 2}
+
+        # Another worker process with the same API key shares the cache.
+        other = OmniApiClient(
+            organization_name="acme", api_key="key", transport=transport, cache=cache
+        )
+        assert other.get("/v1/documents") == {"n": 1}
+        # But not a client with a different API key.
+        other_key = OmniApiClient(
+            organization_name="acme", api_key="other", transport=transport, cache=cache
+        )
+        assert other_key.get("/v1/documents") == {"n": 3}
+
+    def test_writes_evict_cached_responses(self) -> None:
+        transport = InMemoryTransport()
+        user = {"displayName": "A"}
+        transport.add_handler("GET", "/scim/v2/Users/1", lambda request: dict(user))
+        transport.add_handler(
+            "PUT",
+            "/scim/v2/Users/1",
+            lambda request: user.update(request.json()) or user,
+        )
+        client = OmniApiClient(
+            organization_name="acme",
+            api_key="key",
+            transport=transport,
+            cache=TTLCache(),
+        )
+        assert client.get("/scim/v2/Users/1") == {"displayName": "A"}
+        client.put("/scim/v2/Users/1", json_data={"displayName": "B"})
+        assert client.get("/scim/v2/Users/1") == {"displayName": "B"}
+
+    def test_cached_responses_are_copies(self) -> None:
+        transport = InMemoryTransport()
+        transport.add_handler("GET", "/v1/documents", lambda request: {"records": []})
+        client = OmniApiClient(
+            organization_name="acme",
+            api_key="key",
+            transport=transport,
+            cache=TTLCache(),
+        )
+        client.get("/v1/documents")["records"].append("modified")
+        client.get("/v1/documents")["records"].append("modified")
+        assert client.get("/v1/documents") == {"records": []}
@@ -0,0 +1,166 @@
+import dataclasses
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from omni import OmniApiClient, OmniDashboardEmbedder
+from omni.config import OmniConfig, OmniConfigError, OmniConfigFile
+
+
+def write_config(path: Path, data: object, mtime: int) -> None:
+    path.write_text(json.dumps(data))
+    # Bump the mtime explicitly so changes are detected regardless of filesystem timestamp resolution.
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestOmniConfig:
+    def test_env_fallback_resolved_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("OMNI_API_KEY", "env_key")
+        config = OmniConfig(organization_name="acme")
+        monkeypatch.setenv("OMNI_API_KEY", "changed")
+        assert config.api_key == "env_key"
+        assert config.organization_name == "acme"
+        assert config.current is config
+
+    def test_frozen(self) -> None:
+        config = OmniConfig(api_key="key")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.api_key = "other"  # type: ignore[misc]
+
+    def test_required(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.delenv("OMNI_API_KEY", raising=False)
+        with pytest.raises(OmniConfigError):
+            OmniConfig(required_attrs=["api_key"])
+        with pytest.raises(OmniConfigError):
+            OmniApiClient(config=OmniConfig(organization_name="acme"))
+
+    def test_shared_config(self) -> None:
+        config = OmniConfig(
+            organization_name="acme", api_key="key", embed_secret="secret"
+        )
+        client = OmniApiClient(config=config)
+        embedder = OmniDashboardEmbedder(config=config)
+        assert client.base_url == "https://acme.omniapp.co/api"
+        assert client.api_key == "key"
+        assert embedder.embed_login_url == "https://acme.embed-omniapp.co/embed/login"
+        assert embedder.embed_secret == "secret"
+
+    def test_assign_secrets(self) -> None:
+        config = OmniConfig(
+            organization_name="acme", api_key="key", embed_secret="secret"
+        )
+        client = OmniApiClient(config=config)
+        embedder = OmniDashboardEmbedder(config=config)
+        client.api_key = "new_key"
+        embedder.embed_secret = "new_secret"
+        assert client.api_key == "new_key"
+        assert embedder.embed_secret == "new_secret"
+        assert config.api_key == "key"
+
+
+class TestOmniConfigFile:
+    def test_reload(self, tmp_path: Path) -> None:
+        path = tmp_path / "omni.json"
+        write_config(
+            path,
+            {"omni": {"organization_name": "acme", "embed_secret": "first"}},
+            mtime=1_000_000_000,
+        )
+        config_file = OmniConfigFile(
+            path, required_attrs=["embed_secret"], poll_interval=0
+        )
+        embedder = OmniDashboardEmbedder(config=config_file)
+        first_url = embedder.build_url(content_path="/d/1", external_id="1", name="A")
+        assert config_file.reload() is False
+
+        write_config(
+            path,
+            {"organization_name": "acme", "embed_secret": "second"},
+            mtime=2_000_000_000,
+        )
+        assert config_file.reload() is True
+        assert embedder.embed_secret == "second"
+        second_url = embedder.build_url(content_path="/d/1", external_id="1", name="A")
+        assert second_url.split("signature=")[1] != first_url.split("signature=")[1]
+
+        # Broken or incomplete files are ignored and the previous config is kept.
+        path.write_text("{")
+        os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+        assert config_file.reload() is False
+        write_config(path, {"organization_name": "acme"}, mtime=4_000_000_000)
+        assert config_file.reload() is False
+        assert embedder.embed_secret == "second"
+
+    def test_reload_checks_consumer_requirements(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        monkeypatch.delenv("OMNI_API_KEY", raising=False)
+        path = tmp_path / "omni.json"
+        write_config(
+            path, {"organization_name": "acme", "api_key": "first"}, mtime=1_000_000_000
+        )
+        config_file = OmniConfigFile(path, poll_interval=0)
+        client = OmniApiClient(config=config_file)
+        write_config(path, {"organization_name": "acme"}, mtime=2_000_000_000)
+        assert config_file.reload() is False
+        assert client.api_key == "first"
+
+    def test_top_level_not_an_object(self, tmp_path: Path) -> None:
+        path = tmp_path / "omni.json"
+        write_config(path, {"api_key": "first"}, mtime=1_000_000_000)
+        config_file = OmniConfigFile(path, poll_interval=0)
+        write_config(path, [1], mtime=2_000_000_000)
+        assert config_file.reload() is False
+        assert config_file.current.api_key == "first"
+        with pytest.raises(OmniConfigError):
+            OmniConfigFile(path, poll_interval=0)
+
+    def test_toml(self, tmp_path: Path) -> None:
+        pytest.importorskip("tomli" if sys.version_info < (3, 11) else "tomllib")
+        path = tmp_path / "omni.toml"
+        path.write_text('[omni]\norganization_name = "acme"\napi_key = "toml_key"\n')
+        config_file = OmniConfigFile(path, poll_interval=0)
+        assert config_file.current.api_key == "toml_key"
+
+    def test_watch(self, tmp_path: Path) -> None:
+        path = tmp_path / "omni.json"
+        write_config(path, {"api_key": "first"}, mtime=1_000_000_000)
+        config_file = OmniConfigFile(path, poll_interval=0.01)
+        try:
+            write_config(path, {"api_key": "second"}, mtime=2_000_000_000)
+            for _ in range(500):
+                if config_file.current.api_key == "second":
+                    break
+                time.sleep(0.01)
+            assert config_file.current.api_key == "second"
+        finally:
+            config_file.close()
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+    def test_watch_after_fork(self, tmp_path: Path) -> None:
+        path = tmp_path / "omni.json"
+        write_config(path, {"api_key": "first"}, mtime=1_000_000_000)
+        config_file = OmniConfigFile(path, poll_interval=0.01)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child process
+            try:
+                write_config(path, {"api_key": "second"}, mtime=2_000_000_000)
+                for _ in range(500):
+                    if config_file.current.api_key == "second":
+                        break
+                    time.sleep(0.01)
+                os.write(write_fd, str(config_file.current.api_key).encode())
+            finally:
+                os._exit(0)
+        try:
+            os.close(write_fd)
+            os.waitpid(pid, 0)
+            with os.fdopen(read_fd) as f:
+                assert f.read() == "second"
+        finally:
+            config_file.close()
@@ -1,10 +1,14 @@
+import urllib.parse
 from typing import Any
 
 import pytest
 
+import omni.embed
 from omni import OmniDashboardEmbedder
+from omni.cache import TTLCache
 from omni.config import OmniConfigError
 from omni.embed import OmniFilterDefinition, OmniFilterSet
+from omni.profiling import BuildUrlProfile, BuildUrlProfileAggregator
 
 
 @pytest.fixture
@@ -265,6 +269,60 @@ class TestUnit:
         assert embedder.embed_login_url == "https://foo.example.com/embed/login"
 
 
+class TestProfiling:
+    def test_profiler(self, embedder: OmniDashboardEmbedder) -> None:
+        kwargs: dict[str, Any] = dict(
+            content_path="/dashboards/da24491e",
+            external_id="1",
+            name="Somebody",
+            filter_search_params={"state": "GA", "county": "Fulton"},
+            user_attributes={"country": "USA"},
+            groups=["group1"],
+        )
+        unprofiled_url = embedder.build_url(**kwargs)
+        profiles: list[BuildUrlProfile] = []
+        embedder.profiler = profiles.append
+        url = embedder.build_url(**kwargs)
+        assert url == unprofiled_url
+
+        [profile] = profiles
+        sizes = {s.stage: (s.input_size, s.output_size) for s in profile.stages}
+        assert sizes == {
+            "preprocess": (4, 29),
+            "json": (2, 27),
+            "filters": (2, 22),
+            "nonce": (0, 32),
+            "sign": (7, 44),
+            "encode": (8, len(url)),
+        }
+        assert profile.url_length == len(url)
+        assert all(s.duration_ns >= 0 for s in profile.stages)
+        assert profile.total_ns == sum(s.duration_ns for s in profile.stages)
+
+    def test_aggregator(self, embedder: OmniDashboardEmbedder) -> None:
+        aggregator = BuildUrlProfileAggregator()
+        embedder.profiler = aggregator
+        for _ in range(3):
+            embedder.build_url(content_path="/dashboards/1", external_id="1", name="A")
+
+        summary = aggregator.summary()
+        assert list(summary) == [
+            "preprocess",
+            "json",
+            "filters",
+            "nonce",
+            "sign",
+            "encode",
+        ]
+        for stage in summary.values():
+            assert stage.count == sum(stage.histogram.values()) == 3
+            assert stage.min_ns <= stage.mean_ns <= stage.max_ns
+            assert stage.max_ns <= max(stage.histogram) < 2 * max(stage.max_ns, 1)
+
+        aggregator.reset()
+        assert aggregator.summary() == {}
+
+
 class TestFilters:
 
     @pytest.mark.parametrize(
@@ -454,3 +512,232 @@ class TestFilters:
                 '{"is_negative": false, "kind": "EQUALS", "type": "number", "values": [-117.602], "is_inclusive": false}'
             ],
         }
+
+    @pytest.mark.parametrize("operator", list(OmniFilterDefinition.Operator))
+    @pytest.mark.parametrize("filter_type", list(OmniFilterDefinition.Type))
+    @pytest.mark.parametrize("is_negative", [True, False])
+    def test_compiled_filter_set(
+        self,
+        filter_type: OmniFilterDefinition.Type,
+        operator: OmniFilterDefinition.Operator,
+        is_negative: bool,
+    ) -> None:
+        definition = OmniFilterDefinition(
+            field="some.attr",
+            type=filter_type,
+            operator=operator,
+            is_negative=is_negative,
+        )
+        filter_set = OmniFilterSet(attr=definition)
+        compiled_filter_set = OmniFilterSet(attr=definition).compile()
+        for values in [10, -117.602, 'Cali"fornia', ["a", "é"], list(range(1000))]:
+            assert filter_set.get_filter_search_params(
+                {"attr": values}
+            ) == compiled_filter_set.get_filter_search_params({"attr": values})
+
+    def test_filter_search_params_batch(self) -> None:
+        filter_set = OmniFilterSet(
+            distance=OmniFilterDefinition(
+                field="address.distance",
+                type=OmniFilterDefinition.Type.number,
+                operator=OmniFilterDefinition.Operator.less_than_or_equal,
+            ),
+            state=OmniFilterDefinition(
+                field="address.state",
+                type=OmniFilterDefinition.Type.string,
+            ),
+        )
+        columns: dict[str, Any] = {
+            "distance": [10, 1.0, 1e20, -117.602, 10, [1, 2.5]],
+            "state": ["GA", "GA", "New\nYork", 'Zürich, "CH"', ["a", "b"], []],
+        }
+        rows = [
+            {"distance": d, "state": s}
+            for d, s in zip(columns["distance"], columns["state"])
+        ]
+        expected = [
+            urllib.parse.urlencode(filter_set.get_filter_search_params(row), doseq=True)
+            for row in rows
+        ]
+        assert filter_set.get_filter_search_params_batch(columns) == expected
+        assert filter_set.compile().get_filter_search_params_batch(columns) == expected
+        assert filter_set.get_filter_search_params_batch({"distance": []}) == []
+
+        with pytest.raises(ValueError):
+            filter_set.get_filter_search_params_batch(
+                {"distance": [1, 2], "state": ["GA"]}
+            )
+
+    def test_filter_search_params_batch_containers(self) -> None:
+        filter_set = OmniFilterSet(
+            a=OmniFilterDefinition(field="t.a", type=OmniFilterDefinition.Type.string),
+            b=OmniFilterDefinition(field="t.b", type=OmniFilterDefinition.Type.string),
+        ).compile()
+        columns: dict[str, Any] = {
+            "a": [(1, 2), 3, {"x": 1, "y": 2}],
+            "b": ["p", "q", "r"],
+        }
+        assert filter_set.get_filter_search_params_batch(columns) == [
+            urllib.parse.urlencode(
+                filter_set.get_filter_search_params({"a": a, "b": b}), doseq=True
+            )
+            for a, b in zip(columns["a"], columns["b"])
+        ]
+
+    def test_filter_search_params_batch_mispaired_column(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        filter_set = OmniFilterSet(
+            a=OmniFilterDefinition(field="t.a", type=OmniFilterDefinition.Type.string),
+        )
+        monkeypatch.setattr(
+            omni.embed, "_encode_filter_column", lambda compiled, values: values[1:]
+        )
+        with pytest.raises(ValueError):
+            filter_set.get_filter_search_params_batch({"a": ["p", "q"]})
+
+    def test_filter_search_params_batch_numpy(self) -> None:
+        np = pytest.importorskip("numpy")
+        filter_set = OmniFilterSet(
+            latitude=OmniFilterDefinition(
+                field="address.latitude_filter",
+                type=OmniFilterDefinition.Type.number,
+            ),
+        )
+        latitudes = np.array([33.555, -117.602, 10.0])
+        assert filter_set.get_filter_search_params_batch({"latitude": latitudes}) == [
+            urllib.parse.urlencode(
+                filter_set.get_filter_search_params({"latitude": latitude}), doseq=True
+            )
+            for latitude in [33.555, -117.602, 10.0]
+        ]
+
+    def test_build_urls_from_batch(self, embedder: OmniDashboardEmbedder) -> None:
+        filter_set = OmniFilterSet(
+            state=OmniFilterDefinition(
+                field="address.state",
+                type=OmniFilterDefinition.Type.string,
+            ),
+        )
+        urls = embedder.build_urls(
+            content_path="/dashboards/da24491e",
+            external_ids=["1", "2"],
+            names=["One", "Two"],
+            filter_search_params=filter_set.get_filter_search_params_batch(
+                {"state": ["GA", "CA"]}
+            ),
+            theme=OmniDashboardEmbedder.Theme.dawn,
+        )
+        assert urls == [
+            embedder.build_url(
+                content_path="/dashboards/da24491e",
+                external_id=external_id,
+                name=name,
+                filter_search_params=filter_set.get_filter_search_params(
+                    {"state": state}
+                ),
+                theme=OmniDashboardEmbedder.Theme.dawn,
+            )
+            for external_id, name, state in [("1", "One", "GA"), ("2", "Two", "CA")]
+        ]
+
+        with pytest.raises(ValueError):
+            embedder.build_urls(
+                content_path="/dashboards/da24491e", external_ids=["1"], names=[]
+            )
+
+    def test_filter_set_from_dashboard(self) -> None:
+        class FakeClient:
+            base_url = "https://acme.omniapp.co/api"
+
+            def __init__(self) -> None:
+                self.paths: list[str] = []
+
+            def get(self, path: str) -> dict:
+                self.paths.append(path)
+                return {
+                    "filters": {
+                        "a1": {
+                            "fieldName": "address.state",
+                            "type": "string",
+                            "kind": "EQUALS",
+                            "isNegative": True,
+                        },
+                        "b2": {
+                            "fieldName": "address.distance",
+                            "type": "number",
+                            "kind": "LESS_THAN",
+                            "isInclusive": True,
+                        },
+                        "c3": {
+                            "fieldName": "users.created_at",
+                            "type": "date",
+                            "kind": "TIME_FOR_INTERVAL_DURATION",
+                        },
+                    }
+                }
+
+        client = FakeClient()
+        cache = TTLCache()
+        filter_set = OmniFilterSet.from_dashboard(
+            client, "da24491e", cache=cache, background_refresh=False  # type: ignore[arg-type]
+        )
+        assert filter_set.filters == {
+            "address.state": OmniFilterDefinition(
+                field="address.state",
+                type=OmniFilterDefinition.Type.string,
+                is_negative=True,
+            ),
+            "address.distance": OmniFilterDefinition(
+                field="address.distance",
+                type=OmniFilterDefinition.Type.number,
+                operator=OmniFilterDefinition.Operator.less_than_or_equal,
+            ),
+        }
+        assert (
+            OmniFilterSet.from_dashboard(client, "da24491e", cache=cache)  # type: ignore[arg-type]
+            is filter_set
+        )
+        assert client.paths == ["/v1/dashboards/da24491e/filters"]
+
+    @pytest.mark.parametrize("compiled", [True, False])
+    def test_filter_set_encode_query_string(
+        self, embedder: OmniDashboardEmbedder, compiled: bool
+    ) -> None:
+        filter_set = OmniFilterSet(
+            state=OmniFilterDefinition(
+                field="address.state",
+                type=OmniFilterDefinition.Type.string,
+            ),
+            distance=OmniFilterDefinition(
+                field="address.distance",
+                type=OmniFilterDefinition.Type.number,
+                operator=OmniFilterDefinition.Operator.less_than,
+            ),
+        )
+        if compiled:
+            filter_set.compile()
+        query_string = "distance=10&state=GA&unknown=1&state=New+York&state=Z%C3%BCrich"
+        expected = urllib.parse.urlencode(
+            filter_set.get_filter_search_params(
+                {"distance": "10", "state": ["GA", "New York", "Zürich"]}
+            ),
+            doseq=True,
+        )
+        from_str = filter_set.encode_query_string(query_string)
+        from_bytes = filter_set.encode_query_string(query_string.encode())
+        assert from_str == from_bytes == expected
+
+        url = embedder.build_url(
+            content_path="/dashboards/da24491e",
+            external_id="1",
+            name="Somebody",
+            filter_search_params=from_bytes,
+        )
+        assert url == embedder.build_url(
+            content_path="/dashboards/da24491e",
+            external_id="1",
+            name="Somebody",
+            filter_search_params=expected,
+        )
+        assert filter_set.encode_query_string(b"unknown=1") == ""
@@ -0,0 +1,88 @@
+import time
+import urllib.parse
+from typing import Iterator
+
+import pytest
+
+from omni import OmniDashboardEmbedder
+from omni.embed_pool import EmbedUrlPool
+
+USER = {"content_path": "/dashboards/da24491e", "external_id": "1", "name": "Somebody"}
+
+
+@pytest.fixture
+def embedder() -> OmniDashboardEmbedder:
+    return OmniDashboardEmbedder(organization_name="acme", embed_secret="super_secret")
+
+
+@pytest.fixture
+def pool(embedder: OmniDashboardEmbedder) -> Iterator[EmbedUrlPool]:
+    pool = EmbedUrlPool(embedder, size=3)
+    yield pool
+    pool.close()
+
+
+def wait_for_refill(pool: EmbedUrlPool) -> None:
+    deadline = time.monotonic() + 5
+    while pool._refilling and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def nonce(url: str) -> str:
+    return urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)["nonce"][0]
+
+
+class TestEmbedUrlPool:
+    def test_urls_are_handed_out_once(self, pool: EmbedUrlPool) -> None:
+        pool.prime(**USER, mode=OmniDashboardEmbedder.AccessMode.application)
+        wait_for_refill(pool)
+        assert pool.stats.generated == 3
+
+        urls = []
+        for _ in range(3):
+            urls.append(
+                pool.get(**USER, mode=OmniDashboardEmbedder.AccessMode.application)
+            )
+            wait_for_refill(pool)
+        assert pool.stats.hits == 3
+        assert pool.stats.misses == 0
+        assert len({nonce(url) for url in urls}) == 3
+        assert all("mode=APPLICATION" in url for url in urls)
+
+    def test_miss_builds_inline(self, pool: EmbedUrlPool) -> None:
+        url = pool.get(**USER)
+        assert "externalId=1" in url
+        assert pool.stats.misses == 1
+        wait_for_refill(pool)
+        assert pool.stats.generated == 3
+        # Different arguments are pooled separately.
+        pool.get(**{**USER, "external_id": "2"})
+        assert pool.stats.misses == 2
+
+    def test_expired_urls_are_discarded(self, pool: EmbedUrlPool) -> None:
+        pool.max_age = 0.01
+        pool.prime(**USER)
+        wait_for_refill(pool)
+        time.sleep(0.01)
+        pool.get(**USER)
+        assert pool.stats.expired == 3
+        assert pool.stats.misses == 1
+
+    def test_rotated_secret_discards_urls(
+        self, pool: EmbedUrlPool, embedder: OmniDashboardEmbedder
+    ) -> None:
+        pool.prime(**USER)
+        wait_for_refill(pool)
+        embedder._config = type(embedder._config)(embed_secret="rotated_secret")
+        pool.get(**USER)
+        assert pool.stats.expired == 3
+        assert pool.stats.misses == 1
+
+    def test_evict_and_max_keys(self, pool: EmbedUrlPool) -> None:
+        pool.max_keys = 1
+        pool.prime(**USER)
+        pool.prime(**{**USER, "external_id": "2"})
+        wait_for_refill(pool)
+        assert len(pool._urls) == 1
+        pool.evict(**{**USER, "external_id": "2"})
+        assert not pool._urls
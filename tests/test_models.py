@@ -0,0 +1,148 @@
+import json
+from typing import Any
+
+import pytest
+
+from omni import OmniApiClient
+from omni.models import Document, ScimGroup, ScimUser, split_page
+from omni.transport import InMemoryTransport, TransportRequest
+
+USER = {
+    "id": "2208b2c2-ecc8-42ef-a576-caab9c1c58a7",
+    "userName": "somebody@example.com",
+    "displayName": "Somebody",
+    "active": True,
+    "emails": [{"primary": True, "value": "somebody@example.com"}],
+}
+
+
+class TestModels:
+    def test_fields_are_decoded_lazily(self) -> None:
+        user = ScimUser.from_dict(USER)
+        assert isinstance(user._raw, bytes)
+        with pytest.raises(AttributeError):
+            user._display_name
+        assert user.display_name == "Somebody"
+        # All fields are decoded at once.
+        assert user._user_name == "somebody@example.com"
+        assert user.user_name == "somebody@example.com"
+        assert user.active is True
+        assert user.emails == USER["emails"]
+        assert user.groups is None
+
+    def test_wraps_raw_bytes_and_dicts(self) -> None:
+        from_bytes = ScimUser(json.dumps(USER).encode())
+        from_dict = ScimUser(USER)
+        assert from_bytes.id == from_dict.id == USER["id"]
+        assert from_bytes == from_dict
+        assert from_bytes.to_dict() == USER
+
+    def test_slots(self) -> None:
+        user = ScimUser.from_dict(USER)
+        assert not hasattr(user, "__dict__")
+        with pytest.raises(AttributeError):
+            user.nickname = "Some"  # type: ignore[attr-defined]
+
+    def test_document_fields(self) -> None:
+        document = Document.from_dict(
+            {"identifier": "abc123", "name": "Sales", "hasDashboard": True}
+        )
+        assert document.id == "abc123"
+        assert document.has_dashboard is True
+        assert repr(document) == "Document(id='abc123')"
+
+
+class TestListing:
+    @pytest.fixture
+    def transport(self) -> InMemoryTransport:
+        return InMemoryTransport()
+
+    @pytest.fixture
+    def client(self, transport: InMemoryTransport) -> OmniApiClient:
+        return OmniApiClient(
+            organization_name="acme", api_key="key", transport=transport
+        )
+
+    def test_list_users_pages(
+        self, client: OmniApiClient, transport: InMemoryTransport
+    ) -> None:
+        users = [{**USER, "id": str(i)} for i in range(5)]
+        requests: list[dict[str, list[str]]] = []
+
+        @transport.route("GET", "/scim/v2/Users")
+        def list_users(request: TransportRequest) -> dict:
+            requests.append(request.params)
+            start = int(request.params["startIndex"][0]) - 1
+            return {
+                "totalResults": len(users),
+                "Resources": users[start : start + int(request.params["count"][0])],
+            }
+
+        result = list(client.list_users(filter='active eq "true"', page_size=2))
+        assert [user.id for user in result] == ["0", "1", "2", "3", "4"]
+        assert result[0].to_dict() == users[0]
+        assert [r["startIndex"] for r in requests] == [["1"], ["3"], ["5"]]
+        assert requests[0]["filter"] == ['active eq "true"']
+
+    def test_list_groups(
+        self, client: OmniApiClient, transport: InMemoryTransport
+    ) -> None:
+        transport.add_handler(
+            "GET",
+            "/scim/v2/Groups",
+            lambda request: {
+                "totalResults": 1,
+                "Resources": [{"id": "1", "displayName": "Sales"}],
+            },
+        )
+        groups = list(client.list_groups())
+        assert isinstance(groups[0], ScimGroup)
+        assert groups[0].display_name == "Sales"
+
+    def test_list_documents_follows_cursor(
+        self, client: OmniApiClient, transport: InMemoryTransport
+    ) -> None:
+        pages = {
+            None: {
+                "records": [{"identifier": "a"}],
+                "pageInfo": {"hasNextPage": True, "nextCursor": "next"},
+            },
+            "next": {
+                "records": [{"identifier": "b"}],
+                "pageInfo": {"hasNextPage": False, "nextCursor": None},
+            },
+        }
+        transport.add_handler(
+            "GET",
+            "/v1/documents",
+            lambda request: pages[(request.params.get("cursor") or [None])[0]],
+        )
+        documents = client.list_documents(params={"folderId": "f"}, page_size=1)
+        assert [document.id for document in documents] == ["a", "b"]
+
+
+class TestSplitPage:
+    def test_split(self) -> None:
+        users = [USER, {"id": "2", "displayName": 'Some "body", [else]'}]
+        raw = json.dumps(
+            {"totalResults": 2, "Resources": users, "itemsPerPage": 2}, indent=2
+        ).encode()
+        page, resources = split_page(raw, "Resources")
+        assert page == {"totalResults": 2, "itemsPerPage": 2}
+        assert [json.loads(resource) for resource in resources] == users
+
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            (b"{}", ({}, [])),
+            (b'{"Resources": []}', ({}, [])),
+            (b'{"Resources": null}', ({"Resources": None}, [])),
+        ],
+    )
+    def test_empty(self, raw: bytes, expected: tuple) -> None:
+        assert split_page(raw, "Resources") == expected
+
+    @pytest.mark.parametrize("raw", [b"[]", b'{"Resources": [{}', b'{"a": 1 "b": 2}'])
+    def test_invalid(self, raw: bytes) -> None:
+        with pytest.raises(ValueError):
+            split_page(raw, "Resources")
@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import pytest
+import requests
+
+from omni import OmniApiClient
+from omni.transport import InMemoryTransport, TransportRequest, TransportResponse
+
+
+@pytest.fixture
+def transport() -> InMemoryTransport:
+    return InMemoryTransport()
+
+
+@pytest.fixture
+def client(transport: InMemoryTransport) -> OmniApiClient:
+    return OmniApiClient(organization_name="acme", api_key="key", transport=transport)
+
+
+class TestInMemoryTransport:
+    def test_routes_to_handlers(
+        self, client: OmniApiClient, transport: InMemoryTransport
+    ) -> None:
+        received: list[TransportRequest] = []
+
+        @transport.route("GET", "/scim/v2/Users")
+        def list_users(request: TransportRequest) -> dict:
+            received.append(request)
+            return {"totalResults": 0, "Resources": []}
+
+        assert client.get("/scim/v2/Users", params={"count": 10}) == {
+            "totalResults": 0,
+            "Resources": [],
+        }
+        assert received[0].path == "/scim/v2/Users"
+        assert received[0].params == {"count": ["10"]}
+        assert received[0].headers["authorization"] == "Bearer key"
+
+    def test_request_bodies(
+        self, client: OmniApiClient, transport: InMemoryTransport
+    ) -> None:
+        transport.add_handler("PUT", "/v1/items/1", lambda request: request.json())
+        payload = {"rows": list(range(100))}
+        assert client.put("/v1/items/1", json_data=payload) == payload
+        assert client.put("/v1/items/1", json_data=payload, compress=True) == payload
+        chunks = (json.dumps(payload)[i : i + 10].encode() for i in range(0, 400, 10))
+        assert client.put("/v1/items/1", data=chunks, compress=True) == payload
+
+    def test_errors(self, client: OmniApiClient, transport: InMemoryTransport) -> None:
+        transport.add_handler(
+            "DELETE",
+            "/v1/items/1",
+            lambda request: TransportResponse(503, reason="Service Unavailable"),
+        )
+        with pytest.raises(requests.HTTPError, match="503 Server Error"):
+            client.delete("/v1/items/1")
+        with pytest.raises(requests.HTTPError) as exc_info:
+            client.get("/v1/unknown")
+        assert exc_info.value.response is not None
+        assert exc_info.value.response.status_code == 404
+        assert exc_info.value.response.request.method == "GET"
+
+    def test_response_body(self, transport: InMemoryTransport) -> None:
+        transport.add_handler(
+            "GET",
+            "/v1/raw",
+            lambda request: TransportResponse(200, content=gzip.compress(b"{}")),
+        )
+        response = transport.request("GET", "https://acme.omniapp.co/api/v1/raw", {})
+        assert gzip.decompress(response.content) == b"{}"
+        assert response.url == "https://acme.omniapp.co/api/v1/raw"
+
+    def test_raw_responses(
+        self, client: OmniApiClient, transport: InMemoryTransport
+    ) -> None:
+        transport.add_handler(
+            "GET",
+            "/v1/export",
+            lambda request: TransportResponse(
+                200,
+                headers={"Content-Type": "text/csv"},
+                chunks=iter([b"a,b\n", b"1,2\n"]),
+            ),
+        )
+        response = client.get_raw("/v1/export", stream=True)
+        assert response.headers["Content-Type"] == "text/csv"
+        assert list(response.iter_content()) == [b"a,b\n", b"1,2\n"]
+        assert list(response.iter_content()) == []
+        assert client.get_raw("/v1/export").read() == b"a,b\n1,2\n"
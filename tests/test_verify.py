@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+
+from omni import OmniDashboardEmbedder, verify_url, verify_urls
+
+
+@pytest.fixture
+def urls() -> list[str]:
+    embedder = OmniDashboardEmbedder(organization_name="acme", embed_secret="current")
+    old_embedder = OmniDashboardEmbedder(organization_name="acme", embed_secret="old")
+    return [
+        embedder.build_url(
+            content_path="/dashboards/da24491e",
+            external_id="1",
+            name="Some Body",
+            filter_search_params={"state": "GA", "county": "Fulton"},
+            user_attributes={"country": "USA"},
+            link_access=True,
+        ),
+        old_embedder.build_url(
+            content_path="/dashboards/da24491e", external_id="2", name="Somebody"
+        ),
+    ]
+
+
+class TestVerify:
+    def test_verify_url(self, urls: list[str]) -> None:
+        assert verify_url(urls[0], "current")
+        assert verify_url(urls[1], ["current", "old"])
+        assert not verify_url(urls[1], "current")
+        assert not verify_url(urls[0].replace("Some+Body", "Nobody"), "current")
+        assert not verify_url(urls[0].split("&signature=")[0], "current")
+
+    def test_non_ascii_signature(self, urls: list[str]) -> None:
+        bad = urls[0].split("&signature=")[0] + "&signature=%C3%A9abc"
+        assert not verify_url(bad, "current")
+        report = verify_urls([bad, urls[0]], "current", processes=1)
+        assert (report.total, report.valid, report.invalid) == (2, 1, 1)
+        assert report.mismatches[0].reason == "bad_signature"
+
+    def test_corrupt_line_in_file(self, urls: list[str], tmp_path: Path) -> None:
+        path = tmp_path / "access.log"
+        corrupt = urls[0].split("&signature=")[0].encode() + b"&signature=\xff\xfe"
+        path.write_bytes(b"\n".join([urls[0].encode(), corrupt, b"\xed\xa0\x80"]))
+        report = verify_urls(path, "current", processes=1)
+        assert (report.total, report.valid, report.invalid) == (3, 1, 2)
+        assert {m.reason for m in report.mismatches} == {"bad_signature", "unsigned"}
+
+    def test_verify_url_requires_secret(self, urls: list[str]) -> None:
+        with pytest.raises(ValueError):
+            verify_url(urls[0], [])
+
+    def test_verify_urls(self, urls: list[str]) -> None:
+        unsigned = urls[0].split("&signature=")[0]
+        lines = [urls[0] + "\n", "\n", urls[1] + "\n", unsigned + "\n"]
+        progress = []
+
+        report = verify_urls(
+            lines,
+            ["current", "old"],
+            processes=1,
+            chunk_size=2,
+            progress=lambda r: progress.append(r.total),
+        )
+        assert (report.total, report.valid, report.invalid) == (3, 2, 1)
+        assert report.secret_matches == [1, 1]
+        assert [(m.line_number, m.url, m.reason) for m in report.mismatches] == [
+            (4, unsigned, "unsigned")
+        ]
+        assert progress == [1, 3]
+
+    def test_verify_urls_from_file(self, urls: list[str], tmp_path: Path) -> None:
+        path = tmp_path / "access.log"
+        path.write_text("\n".join(urls * 50))
+
+        report = verify_urls(path, "current", processes=2, chunk_size=7)
+        assert (report.total, report.valid, report.invalid) == (100, 50, 50)
+        assert {m.reason for m in report.mismatches} == {"bad_signature"}
+        assert report.mismatches[0].line_number == 2
+        assert report.urls_per_second > 0
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from omni import OmniApiClient
+from omni.transport import InMemoryTransport, TransportRequest, TransportResponse
+from omni.writebehind import PendingWrite, WriteBehindQueue
+
+
+@pytest.fixture
+def client(server_url: str) -> Iterator[OmniApiClient]:
+    client = OmniApiClient(organization_name="acme", api_key="key")
+    client.base_url = server_url
+    sent: list[tuple[str, str, dict | None]] = []
+    client.sent = sent  # type: ignore[attr-defined]
+    request = client._request_raw
+
+    def record(method, path, json_data=None, **kwargs):  # type: ignore[no-untyped-def]
+        response = request(method, path, json_data=json_data, **kwargs)
+        sent.append((method, path, json_data))
+        return response
+
+    client._request_raw = record  # type: ignore[method-assign]
+    yield client
+    client.close()
+
+
+class TestWriteBehindQueue:
+    def test_merges_writes_to_the_same_resource(
+        self, client: OmniApiClient, tmp_path: Path
+    ) -> None:
+        with WriteBehindQueue(
+            client, tmp_path / "writes.db", flush_interval=0
+        ) as queue:
+            queue.put("/scim/v2/Users/1", {"displayName": "A"})
+            queue.put("/scim/v2/Users/2", {"displayName": "B"})
+            queue.put("/scim/v2/Users/1", {"displayName": "C"})
+            queue.post("/scim/v2/Users", {"userName": "d"})
+            queue.post("/scim/v2/Users", {"userName": "e"})
+            queue.delete("/scim/v2/Users/2")
+            assert queue.pending == 4
+            assert queue.flush() == 4
+            assert queue.pending == 0
+        assert sorted(client.sent, key=repr) == [  # type: ignore[attr-defined]
+            ("DELETE", "/scim/v2/Users/2", None),
+            ("POST", "/scim/v2/Users", {"userName": "d"}),
+            ("POST", "/scim/v2/Users", {"userName": "e"}),
+            ("PUT", "/scim/v2/Users/1", {"displayName": "C"}),
+        ]
+
+    def test_pending_writes_survive_restart(
+        self, client: OmniApiClient, tmp_path: Path
+    ) -> None:
+        queue = WriteBehindQueue(client, tmp_path / "writes.db", flush_interval=0)
+        queue.put("/scim/v2/Users/1", {"displayName": "A"})
+        queue.close(flush=False)
+        queue = WriteBehindQueue(client, tmp_path / "writes.db", flush_interval=0)
+        assert queue.pending == 1
+        queue.close()
+        assert client.sent == [  # type: ignore[attr-defined]
+            ("PUT", "/scim/v2/Users/1", {"displayName": "A"})
+        ]
+
+    def test_retries_server_errors(self, client: OmniApiClient, tmp_path: Path) -> None:
+        errors: list[tuple[PendingWrite, Exception]] = []
+        with WriteBehindQueue(
+            client,
+            tmp_path / "writes.db",
+            flush_interval=0,
+            max_attempts=2,
+            retry_backoff=0.05,
+            on_error=lambda write, error: errors.append((write, error)),
+        ) as queue:
+            queue.put("/v1/unavailable", {"a": 1})
+            queue.put("/v1/missing", {"a": 1})
+            assert queue.flush() == 0
+            # The 404 is dropped right away, the 503 is retried after the backoff.
+            assert [write.path for write, _ in errors] == ["/v1/missing"]
+            assert queue.pending == 1
+            assert queue.flush() == 0
+            time.sleep(0.05)
+            assert queue.flush() == 0
+            assert queue.pending == 0
+        assert [(write.path, write.attempts) for write, _ in errors] == [
+            ("/v1/missing", 1),
+            ("/v1/unavailable", 2),
+        ]
+
+    def test_empty_responses(self, tmp_path: Path) -> None:
+        transport = InMemoryTransport()
+        transport.add_handler(
+            "DELETE", "/scim/v2/Users/1", lambda request: TransportResponse(204)
+        )
+        client = OmniApiClient(
+            organization_name="acme", api_key="key", transport=transport
+        )
+        errors: list[tuple[PendingWrite, Exception]] = []
+        with WriteBehindQueue(
+            client,
+            tmp_path / "writes.db",
+            flush_interval=0,
+            on_error=lambda write, error: errors.append((write, error)),
+        ) as queue:
+            queue.delete("/scim/v2/Users/1")
+            assert queue.flush() == 1
+            assert queue.pending == 0
+        assert errors == []
+
+    def test_background_flush(self, client: OmniApiClient, tmp_path: Path) -> None:
+        with WriteBehindQueue(
+            client, tmp_path / "writes.db", flush_interval=0.01
+        ) as queue:
+            queue.put("/scim/v2/Users/1", {"displayName": "A"})
+            deadline = time.monotonic() + 5
+            while queue.pending and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert queue.pending == 0
+
+    def test_queues_sharing_a_file_send_each_write_once(self, tmp_path: Path) -> None:
+        transport = InMemoryTransport()
+        sent: list[int] = []
+
+        @transport.route("POST", "/v1/items")
+        def post_item(request: TransportRequest) -> dict:
+            time.sleep(0.001)
+            sent.append(request.json()["i"])
+            return {}
+
+        client = OmniApiClient(
+            organization_name="acme", api_key="key", transport=transport
+        )
+        queues = [
+            WriteBehindQueue(client, tmp_path / "writes.db", flush_interval=0)
+            for _ in range(4)
+        ]
+        for i in range(200):
+            queues[0].post("/v1/items", {"i": i})
+        threads = [threading.Thread(target=queue.flush) for queue in queues]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for queue in queues:
+            queue.close()
+        assert sorted(sent) == list(range(200))
+
+    def test_expired_leases_are_sent_again(
+        self, client: OmniApiClient, tmp_path: Path
+    ) -> None:
+        crashed = WriteBehindQueue(
+            client, tmp_path / "writes.db", flush_interval=0, lease_duration=0.05
+        )
+        crashed.put("/scim/v2/Users/1", {"displayName": "A"})
+        # Leased by a flush that never completes, e.g. in a process that was killed.
+        assert len(crashed._due(limit=10)) == 1
+        with WriteBehindQueue(
+            client, tmp_path / "writes.db", flush_interval=0
+        ) as queue:
+            assert queue.flush() == 0
+            time.sleep(0.05)
+            assert queue.flush() == 1
+        crashed.close(flush=False)
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+    def test_fork(self, client: OmniApiClient, tmp_path: Path) -> None:
+        queue = WriteBehindQueue(client, tmp_path / "writes.db", flush_interval=0.01)
+        read_fd, write_fd = os.pipe()
+        # Held so that the parent's background thread doesn't send the child's write, and to check that the child
+        # doesn't inherit it.
+        with queue._flush_lock:
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover - runs in the child process
+                try:
+                    queue.put("/scim/v2/Users/1", {"displayName": "A"})
+                    deadline = time.monotonic() + 5
+                    while queue.pending and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    queue.close(flush=False)
+                    os.write(write_fd, str(len(client.sent)).encode())  # type: ignore[attr-defined]
+                finally:
+                    os._exit(0)
+            os.close(write_fd)
+            os.waitpid(pid, 0)
+        # Sent by the child's own background thread.
+        with os.fdopen(read_fd) as f:
+            assert f.read() == "1"
+        assert queue.pending == 0
+        queue.close()